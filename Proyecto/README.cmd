@@ -8,8 +8,37 @@ git clone https://github.com/Quintaneishon/IA
 cd IA/Proyecto
 ```
 
-2.- Ejecutar el codigo
+2.- Instalar dependencias (solo se necesitan para la evaluación en lote de `batch_cost.py`)
+
+```
+pip install -r requirements.txt
+```
+
+3.- Ejecutar el codigo
 
 ```
 python main.py
 ```
+
+
+4.- Resolver muchos horarios a la vez (varios sitios y meses)
+
+```
+python batch_solve.py configuraciones.jsonl -o horarios.jsonl
+```
+
+Acepta un archivo JSONL (una configuración por línea) o un directorio con archivos `.json`. Las configuraciones
+con el mismo `"sitio"` se resuelven mes por mes, pasando el estado de las personas al mes siguiente; cada
+horario se escribe como una línea JSON en cuanto termina.
+
+
+5.- Medir los solvers con casos sintéticos
+
+```
+python benchmark.py -o base.jsonl
+python benchmark.py -c 8x4x30,12x5x31 --carga 1.25 --comparar base.jsonl -o nuevo.jsonl
+```
+
+Cada línea del resultado tiene el tiempo, las evaluaciones por segundo, la memoria pico y la traza del mejor
+costo de un solver en un caso; `--comparar` muestra la diferencia contra una corrida anterior (p. ej. de otro
+commit). Con `--perfil cprofile` o `--perfil tracemalloc` se mide cada llamada a `Schedule.calculate_cost`.
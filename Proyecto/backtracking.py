@@ -1,46 +1,228 @@
-from simulated_annealing import init_plan
+import time
 
+from plan import UNASSIGNED
+from rules import PERSON_CAP, rule_delta
 
-def backtracking(schedule, iteration_limit=100000):
-    best_plan = None
-    best_cost = float('inf')
-    best_penalties = None
-    iteration_count = 0
+# Time budget (seconds) for the exact search
+TIME_LIMIT = 30
+# How many nodes to explore between clock checks
+CHECK_EVERY = 1024
 
-    def assign_roles(day, current_plan):
-        nonlocal best_plan, best_cost, best_penalties, iteration_count
 
-        if iteration_count >= iteration_limit:
-            raise Exception("Limit reached")
+class _Budget(Exception):
+    pass
 
-        if day > schedule.n_days:
-            current_cost, current_penalties = schedule.calculate_cost(current_plan)
-            if current_cost < best_cost:
-                best_plan = current_plan
-                best_cost = current_cost
-                best_penalties = current_penalties
-            return
 
-        if current_plan is None:
-            current_plan = {d: {role: None for role in schedule.roles} for d in range(1, schedule.n_days + 1)}
+# Exact branch and bound over the (day, role) cells of a Plan.
+# Days are filled in order so the partial cost is always a lower bound of the cost of the assigned cells,
+# exact once their day is complete; inside a day the most constrained role goes first.
+# fixed is an optional Plan whose assigned cells are kept as they are, and prefer an optional Plan
+# whose person is tried first for each cell (to stay close to a previous roster).
+def branch_and_bound(schedule, time_limit=TIME_LIMIT, plan=None, node_limit=None, fixed=None, prefer=None):
+    start_time = time.perf_counter()
+    roles = schedule.role_names
+    n_roles = len(roles)
+    persons = range(schedule.persons)
+    max_month = schedule.max_month_days
+    max_week = schedule.max_week_days
+    # Custom penalties and rules for some persons may single out a person, so persons are only
+    # interchangeable without them
+    symmetric = (not schedule.custom_penalties and not any(rule.get('selective') for rule in schedule.rules)
+                 and fixed is None)
+    fixed_cells = schedule.as_plan(fixed).cells if fixed is not None else None
+    prefer_cells = schedule.as_plan(prefer).cells if prefer is not None else None
+    # Persons carrying a different state from the previous month are not interchangeable either
+    signature = [(schedule.history_last[person], schedule.week_carry[person]) for person in range(schedule.persons)]
+
+    current = schedule.empty_plan()
+    cells = current.cells
+    work_days = [0] * schedule.persons
+    week_days = [[0] * schedule.persons for _ in range(schedule.n_weeks)]
+    week_days[0] = list(schedule.week_carry)
+    day_persons = [None] + [[0] * schedule.persons for _ in range(schedule.n_days)]
+    rule_worked = [[0] * schedule.persons if rule['kind'] == PERSON_CAP else None for rule in schedule.rules]
+
+    # Remaining cells per week and free capacity before the month/week limits are reached
+    week_left = [0] * schedule.n_weeks
+    for day in range(schedule.n_days):
+        week_left[schedule.week_of_day[day]] += n_roles
+    week_free = [sum(max(0, max_week - days) for days in week) for week in week_days]
+    state = {'left': schedule.n_days * n_roles, 'month_free': max_month * schedule.persons}
+
+    best = {'plan': None, 'cost': float('inf'), 'penalties': None}
+    stats = {'nodes': 0, 'complete': True}
+    # Each new incumbent, in the same format as the annealing convergence trace
+    trace = []
+
+    # The plan given as a warm start only provides the first incumbent
+    if plan is not None:
+        plan = schedule.as_plan(plan)
+        best['cost'], best['penalties'] = schedule.calculate_cost(plan)
+        best['plan'] = plan.copy()
+        trace.append({'step': 0, 'time': time.perf_counter() - start_time, 'best': best['cost']})
+
+    def remaining_bound(first_week):
+        # Month: every cell beyond the free capacity costs at least 2
+        bound = 2 * max(0, state['left'] - state['month_free'])
+        # Week: if a week cannot be covered with the free capacity, someone has to exceed it
+        for week in range(first_week, schedule.n_weeks):
+            if week_left[week] > week_free[week] and not any(days > max_week for days in week_days[week]):
+                bound += 5
+        return bound
+
+    def rest_cost(day, role, person):
+        # Change in rest violations from assigning person to (day, role) between its neighbors. Inside a
+        # day the roles are not filled in time order, so a later role may already be assigned and this can
+        # be negative (e.g. an extra role between a night and a day role): it only orders the candidates.
+        slot = (day, role)
+        previous, following = schedule.rest_neighbors(cells, person, day, role)
+        violation = schedule.rest_violation
+        return violation(previous, slot) + violation(slot, following) - violation(previous, following)
 
-        assigned_persons = set()
-        for role in schedule.roles:
-            for person in range(schedule.persons):
-                if person in assigned_persons:
-                    continue  # Skip assigning the same person to multiple roles on the same day
+    def day_rest_cost(day):
+        # Exact rest violations ending on a complete day: every assignment against the previous one
+        violations = 0
+        for index, role in enumerate(roles):
+            person = cells[(day - 1) * n_roles + index]
+            if person != UNASSIGNED:
+                previous, _ = schedule.rest_neighbors(cells, person, day, role)
+                violations += schedule.rest_violation(previous, (day, role))
+        return 10 * violations
+
+    def assignment_cost(day, role, person):
+        # Cost added by assigning person to (day, role) given the cells assigned so far, except the rest
+        # penalty, which is added when the day is complete
+        cost = 0
+        if work_days[person] >= max_month:
+            cost += 2
+        if week_days[schedule.week_of_day[day - 1]][person] == max_week:
+            cost += 5
+        if day_persons[day][person]:
+            cost += 15
+        for rule, worked in zip(schedule.rules, rule_worked):
+            cost += rule['cost'] * rule_delta(schedule, rule, cells, day, schedule.role_index[role], UNASSIGNED,
+                                              person, worked)
+        return cost
+
+    def assign(day, index, person, value):
+        week = week_days[schedule.week_of_day[day - 1]]
+        for rule, worked in zip(schedule.rules, rule_worked):
+            if worked is not None and rule['roles'][index]:
+                worked[person] += 1 if value else -1
+        if value:
+            cells[(day - 1) * n_roles + index] = person
+            if work_days[person] < max_month:
+                state['month_free'] -= 1
+            if week[person] < max_week:
+                week_free[schedule.week_of_day[day - 1]] -= 1
+            work_days[person] += 1
+            week[person] += 1
+            day_persons[day][person] += 1
+            state['left'] -= 1
+            week_left[schedule.week_of_day[day - 1]] -= 1
+        else:
+            cells[(day - 1) * n_roles + index] = UNASSIGNED
+            work_days[person] -= 1
+            week[person] -= 1
+            day_persons[day][person] -= 1
+            if work_days[person] < max_month:
+                state['month_free'] += 1
+            if week[person] < max_week:
+                week_free[schedule.week_of_day[day - 1]] += 1
+            state['left'] += 1
+            week_left[schedule.week_of_day[day - 1]] += 1
+
+    def candidates(day, role):
+        cell = (day - 1) * n_roles + schedule.role_index[role]
+        if fixed_cells is not None and fixed_cells[cell] != UNASSIGNED:
+            person = fixed_cells[cell]
+            cost = assignment_cost(day, role, person)
+            return [(cost, cost, 0, 0, person)]
+
+        # Persons that have never worked (with the same history) are interchangeable, only the first is tried.
+        # They are tried in order of cost counting the change in rest violations, but pruned by the cost
+        # without it, which is a lower bound until the day is complete.
+        options = []
+        fresh_seen = set()
+        for person in persons:
+            if symmetric and work_days[person] == 0:
+                if signature[person] in fresh_seen:
+                    continue
+                fresh_seen.add(signature[person])
+            changed = prefer_cells is not None and prefer_cells[cell] != person
+            cost = assignment_cost(day, role, person)
+            rest = 10 * rest_cost(day, role, person) if schedule.check_rest else 0
+            options.append((cost + rest, cost, changed, work_days[person], person))
+        options.sort()
+        return options
+
+    def search(day, pending, cost):
+        stats['nodes'] += 1
+        if stats['nodes'] % CHECK_EVERY == 0:
+            if time.perf_counter() - start_time > time_limit or (node_limit and stats['nodes'] > node_limit):
+                raise _Budget()
+
+        if not pending:
+            # Day complete: add the rest periods, custom penalties and coverage rules, which are evaluated per day
+            if schedule.check_rest:
+                cost += day_rest_cost(day)
+            for penalty_cost, penalty_function in schedule.custom_penalties.values():
+                if penalty_function(schedule, day, current):
+                    cost += penalty_cost
+            for rule in schedule.rules:
+                if 'flags' in rule and rule['flags'][day - 1]:
+                    cost += rule['cost']
+            if day == schedule.n_days:
+                if cost < best['cost']:
+                    best['cost'], best['penalties'] = schedule.calculate_cost(current)
+                    best['plan'] = current.copy()
+                    trace.append({'step': stats['nodes'], 'time': time.perf_counter() - start_time,
+                                  'best': best['cost']})
+                return
+            if cost + remaining_bound(schedule.week_of_day[day]) >= best['cost']:
+                return
+            search(day + 1, list(range(n_roles)), cost)
+            return
 
-                current_plan[day][role] = person
-                iteration_count += 1
+        # Most constrained role of the day first: fewest persons that can take it for free
+        options_by_role = [(index, candidates(day, roles[index])) for index in pending]
+        index, options = min(options_by_role,
+                             key=lambda item: sum(1 for option in item[1] if option[0] <= 0))
+        rest_pending = [other for other in pending if other != index]
+        week = schedule.week_of_day[day - 1]
 
-                # Recursively assign roles for next day
-                assign_roles(day + 1, current_plan)
+        for _, extra, _, _, person in options:
+            if cost + extra >= best['cost']:
+                continue
+            assign(day, index, person, True)
+            if cost + extra + remaining_bound(week) < best['cost']:
+                search(day, rest_pending, cost + extra)
+            assign(day, index, person, False)
 
-                # Backtracking step
-                current_plan[day][role] = None
+    root_bound = remaining_bound(0)
+    try:
+        search(1, list(range(n_roles)), 0)
+    except _Budget:
+        stats['complete'] = False
 
-    # Start the backtracking algorithm from day 1
+    # If the whole tree was explored the incumbent is optimal; otherwise the root bound is what we know
+    lower_bound = best['cost'] if stats['complete'] else min(root_bound, best['cost'])
+    elapsed = time.perf_counter() - start_time
+    return {
+        'plan': best['plan'],
+        'cost': best['cost'],
+        'penalties': best['penalties'],
+        'lower_bound': lower_bound,
+        'gap': best['cost'] - lower_bound,
+        'optimal': best['cost'] == lower_bound,
+        'nodes': stats['nodes'],
+        'time': elapsed,
+        'trace': trace,
+    }
 
-    assign_roles(1, init_plan(schedule))
 
-    return best_plan, best_cost, best_penalties
+def backtracking(schedule, time_limit=TIME_LIMIT, plan=None):
+    result = branch_and_bound(schedule, time_limit=time_limit, plan=plan)
+    if not result['optimal']:
+        raise Exception(f"Limit reached (gap {result['gap']})")
+    return result['plan'], result['cost'], result['penalties']
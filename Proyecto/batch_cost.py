@@ -0,0 +1,112 @@
+import numpy as np
+
+from plan import Plan
+from rules import COVERAGE, PERSON_CAP, UNAVAILABLE
+from schedule import PENALTY_DOUBLE, PENALTY_MONTH, PENALTY_REST, PENALTY_WEEK, NIGHT_ROLE, DAY_ROLES
+
+# Costo de cada penalización base, en el mismo orden que Schedule.calculate_cost
+BASE_PENALTIES = [(PENALTY_MONTH, 2), (PENALTY_REST, 10), (PENALTY_WEEK, 5), (PENALTY_DOUBLE, 15)]
+
+
+def penalty_names(schedule):
+    return ([name for name, _ in BASE_PENALTIES] + list(schedule.custom_penalties)
+            + [rule['name'] for rule in schedule.rules])
+
+
+# Juntar varios planes (Plan o dict) en un tensor (planes, días, roles)
+def stack_plans(schedule, plans):
+    cells = b''.join(schedule.as_plan(plan).tobytes() for plan in plans)
+    return np.frombuffer(cells, dtype=np.int16).reshape(len(plans), schedule.n_days, len(schedule.role_names))
+
+
+# Costo de muchos planes a la vez. plans es un tensor de enteros (planes, días, roles); regresa el vector
+# de costos y la matriz (planes, penalizaciones) con el conteo de cada penalización en el orden de
+# penalty_names. Da exactamente lo mismo que Schedule.calculate_cost para cada plan.
+def batch_cost(schedule, plans):
+    plans = np.asarray(plans)
+    n_plans, n_days, n_roles = plans.shape
+    if n_days != schedule.n_days or n_roles != len(schedule.role_names):
+        raise ValueError(f"Se esperaban planes de {schedule.n_days} días y {len(schedule.role_names)} roles")
+    if plans.size and (plans.min() < 0 or plans.max() >= schedule.persons):
+        raise ValueError(f"Hay celdas sin asignar o con personas fuera de 0..{schedule.persons - 1}")
+
+    # Una columna por persona: cuántas veces aparece en cada día
+    one_hot = plans[..., None] == np.arange(schedule.persons)
+    per_day = one_hot.sum(axis=2)
+
+    # Exceso en el mes
+    month = np.maximum(per_day.sum(axis=1) - schedule.max_month_days, 0).sum(axis=1)
+
+    # Exceso en la semana: 1 por persona y semana que pasa del máximo
+    week_matrix = np.zeros((n_days, schedule.n_weeks), dtype=np.int64)
+    week_matrix[np.arange(n_days), schedule.week_of_day] = 1
+    per_week = np.einsum('bdn,dw->bwn', per_day, week_matrix)
+    per_week[:, 0] += np.array(schedule.week_carry)
+    week = (per_week > schedule.max_week_days).sum(axis=(1, 2))
+
+    # Doble rol: cada aparición extra de una persona en el mismo día
+    double = np.maximum(per_day - 1, 0).sum(axis=(1, 2))
+
+    # Descanso insuficiente: se compara cada asignación con la anterior de la misma persona
+    rest = np.zeros(n_plans, dtype=np.int64)
+    if schedule.check_rest:
+        n_slots = n_days * n_roles
+        flat = plans.reshape(n_plans, n_slots).astype(np.intp)
+        slots = np.arange(n_slots)
+        slot_hot = one_hot.reshape(n_plans, n_slots, schedule.persons)
+        # Última asignación de cada persona antes del mes (slots negativos), o none si no hay
+        none = -(schedule.rest_days + 1) * n_roles
+        initial = np.array([none if last is None or last[1] not in schedule.role_index else (last[0] - 1) * n_roles + schedule.role_index[last[1]]
+                            for last in schedule.history_last])
+        initial = np.maximum(initial, none)
+        last = np.maximum.accumulate(np.where(slot_hot, slots[None, :, None], initial), axis=1)
+        last_before = np.concatenate([np.broadcast_to(initial, (n_plans, 1, schedule.persons)), last[:, :-1]],
+                                     axis=1)
+        previous = np.take_along_axis(last_before, flat[..., None], axis=2)[..., 0]
+
+        night = schedule.role_index[NIGHT_ROLE]
+        day_roles = [schedule.role_index[role] for role in DAY_ROLES if role in schedule.role_index]
+        is_day_role = np.isin(slots % n_roles, day_roles)
+        violation = ((previous > none) & (previous % n_roles == night) & is_day_role
+                     & (slots // n_roles - previous // n_roles < schedule.rest_days))
+        rest = violation.sum(axis=1)
+
+    breakdown = np.zeros((n_plans, len(penalty_names(schedule))), dtype=np.int64)
+    breakdown[:, 0] = month
+    breakdown[:, 1] = rest
+    breakdown[:, 2] = week
+    breakdown[:, 3] = double
+    costs = breakdown[:, :len(BASE_PENALTIES)] @ np.array([cost for _, cost in BASE_PENALTIES])
+
+    # Penalizaciones personalizadas: si la función tiene un método batch(schedule, plans) se usa
+    # (debe regresar algo que se pueda expandir a (planes, días)); si no, se llama por plan y día
+    for column, (penalty_cost, penalty_function) in enumerate(schedule.custom_penalties.values(),
+                                                               len(BASE_PENALTIES)):
+        if hasattr(penalty_function, 'batch'):
+            flags = np.broadcast_to(np.asarray(penalty_function.batch(schedule, plans), dtype=bool),
+                                    (n_plans, n_days))
+        else:
+            flags = np.zeros((n_plans, n_days), dtype=bool)
+            for i in range(n_plans):
+                plan = Plan.frombytes(n_days, schedule.role_names, plans[i].astype(np.int16).tobytes())
+                for day in range(1, n_days + 1):
+                    flags[i, day - 1] = bool(penalty_function(schedule, day, plan))
+        breakdown[:, column] = flags.sum(axis=1)
+        costs = costs + breakdown[:, column] * penalty_cost
+
+    # Reglas declarativas, a partir de sus tablas compiladas
+    for column, rule in enumerate(schedule.rules, len(BASE_PENALTIES) + len(schedule.custom_penalties)):
+        if rule['kind'] == COVERAGE:
+            counts = np.full(n_plans, sum(rule['flags']))
+        elif rule['kind'] == PERSON_CAP:
+            worked = one_hot[:, :, np.array(rule['roles'])].sum(axis=(1, 2))
+            counts = (np.maximum(worked - rule['max'], 0) * np.array(rule['persons'])).sum(axis=1)
+        elif rule['kind'] == UNAVAILABLE:
+            counts = (one_hot & np.array(rule['blocked'])[None, :, None, :]).sum(axis=(1, 2, 3))
+        else:
+            gap = rule['gap']
+            counts = (plans[:, :n_days - gap, rule['first']] == plans[:, gap:, rule['second']]).sum(axis=1)
+        breakdown[:, column] = counts
+        costs = costs + counts * rule['cost']
+
+    return costs, breakdown
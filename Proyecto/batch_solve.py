@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from main import build_schedule, find_plan
+
+
+# Leer las configuraciones de un directorio (un .json por archivo) o de un archivo JSONL (una por línea)
+def read_configs(source):
+    configs = []
+    if os.path.isdir(source):
+        for file_name in sorted(os.listdir(source)):
+            if file_name.endswith('.json'):
+                with open(os.path.join(source, file_name), 'r') as file:
+                    config = json.load(file)
+                config.setdefault('sitio', os.path.splitext(file_name)[0])
+                configs.append(config)
+    else:
+        with open(source, 'r') as file:
+            for number, line in enumerate(file, 1):
+                if line.strip():
+                    config = json.loads(line)
+                    config.setdefault('sitio', f"{os.path.basename(source)}:{number}")
+                    configs.append(config)
+    return configs
+
+
+# Agrupar por sitio y ordenar cada sitio por mes, porque el estado de las personas pasa de un mes al siguiente
+def group_by_site(configs):
+    sites = {}
+    for config in configs:
+        sites.setdefault(config['sitio'], []).append(config)
+    for months in sites.values():
+        months.sort(key=lambda config: (config['ano'], config['mes']))
+    return sites
+
+
+def consecutive(previous, config):
+    return (previous['ano'] * 12 + previous['mes']) + 1 == config['ano'] * 12 + config['mes']
+
+
+# Resolver un mes en un proceso del pool
+def solve_month(config, history):
+    start = time.perf_counter()
+    s = build_schedule(config, history)
+    result = find_plan(s, config, verbose=False)
+    return {
+        'sitio': config['sitio'],
+        'ano': config['ano'],
+        'mes': config['mes'],
+        'costo': result['cost'],
+        'optimo': result['optimal'],
+        'cota_inferior': result['lower_bound'],
+        'penalizaciones': result['penalties'],
+        'tiempo': time.perf_counter() - start,
+        'plan': result['plan'].to_dict(),
+        'historial': s.next_history(result['plan']),
+    }
+
+
+def error_result(config, error):
+    return {'sitio': config['sitio'], 'ano': config.get('ano'), 'mes': config.get('mes'),
+            'error': f"{type(error).__name__}: {error}"}
+
+
+# Resolver todos los sitios en paralelo; cada roster se escribe como una línea JSON en cuanto termina. Si un
+# mes falla (configuración inválida o error del solver) se escribe una línea con "error" y el sitio sigue
+# con el mes siguiente, sin historial.
+def solve_batch(configs, output, workers=None):
+    sites = group_by_site(configs)
+    pending = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for site, months in sites.items():
+            pending[executor.submit(solve_month, months[0], None)] = (site, 0)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                site, index = pending.pop(future)
+                months = sites[site]
+                try:
+                    result = future.result()
+                except Exception as error:
+                    result = error_result(months[index], error)
+                output.write(json.dumps(result, ensure_ascii=False) + '\n')
+                output.flush()
+
+                if index + 1 < len(months):
+                    # El historial solo aplica si el siguiente mes sigue inmediatamente a este
+                    following = months[index + 1]
+                    history = None
+                    if 'error' not in result and consecutive(months[index], following):
+                        history = result['historial']
+                    pending[executor.submit(solve_month, following, history)] = (site, index + 1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Resolver muchos horarios (sitios x meses) en paralelo")
+    parser.add_argument('source', help="directorio con configuraciones .json o archivo .jsonl")
+    parser.add_argument('-o', '--output', help="archivo JSONL de salida (por defecto la salida estándar)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="procesos del pool")
+    args = parser.parse_args()
+
+    configs = read_configs(args.source)
+    if args.output:
+        with open(args.output, 'w') as output:
+            solve_batch(configs, output, args.workers)
+    else:
+        solve_batch(configs, sys.stdout, args.workers)
@@ -0,0 +1,308 @@
+import argparse
+import cProfile
+import json
+import math
+import os
+import platform
+import pstats
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from backtracking import branch_and_bound
+from main import build_schedule
+from parallel_annealing import parallel_annealing
+from schedule import Schedule
+from simulated_annealing import init_plan, simulated_annealing
+
+try:
+    import resource
+except ImportError:
+    # En Windows no existe; la memoria pico se reporta como null
+    resource = None
+
+# Roles de los casos sintéticos; a partir del cuarto se generan horarios aleatorios
+STANDARD_ROLES = {'auxiliar': [7, 17], 'operador_dia': [11, 21], 'operador_noche': [21, 7]}
+# Un mes para cada número de días posible
+MONTHS_BY_DAYS = {28: (2023, 2), 29: (2024, 2), 30: (2024, 4), 31: (2024, 10)}
+# Casos por defecto como (personas, roles, días)
+DEFAULT_CASES = [(4, 3, 28), (5, 3, 31), (8, 4, 30), (12, 5, 31), (20, 6, 31)]
+# Planes aleatorios que se evalúan en el modo calculate_cost
+COST_EVALUATIONS = 2000
+TIME_LIMIT = 5
+# Recocido paralelo: cadenas, pasos entre intercambios (cada intercambio es un punto de la traza) y procesos;
+# al menos dos procesos para que el pool de verdad corra cadenas a la vez
+PARALLEL_CHAINS = 4
+PARALLEL_EXCHANGE_EVERY = 2000
+PARALLEL_WORKERS = max(2, min(PARALLEL_CHAINS, os.cpu_count() or 1))
+
+
+# Configuración sintética: los máximos de días se ajustan para que con carga 1 el trabajo apenas quepa;
+# con carga mayor que 1 hay excesos inevitables y el problema es más difícil de probar óptimo
+def synthetic_config(persons, roles, days=31, seed=0, load=1.0):
+    if days not in MONTHS_BY_DAYS:
+        raise ValueError(f"Un mes tiene de 28 a 31 días, no {days}")
+    if persons < 1 or roles < 1:
+        raise ValueError("Se necesita al menos una persona y un rol")
+    if load <= 0:
+        raise ValueError("La carga debe ser positiva")
+    rng = random.Random(seed)
+    role_hours = dict(list(STANDARD_ROLES.items())[:roles])
+    for number in range(len(role_hours) + 1, roles + 1):
+        start = rng.randrange(24)
+        role_hours[f'rol_{number}'] = [start, (start + rng.choice([8, 10, 12])) % 24]
+    year, month = MONTHS_BY_DAYS[days]
+    return {
+        'sitio': f'sintetico_{persons}x{roles}x{days}',
+        'num_personas': persons,
+        'max_dias_mes': math.ceil(days * roles / (persons * load)),
+        'max_dias_semana': min(7, math.ceil(7 * roles / (persons * load))),
+        'dias_descanso_cambio_turno': 2,
+        'roles': role_hours,
+        'mes': month,
+        'ano': year,
+    }
+
+
+def parse_case(text):
+    persons, roles, days = (int(value) for value in text.split('x'))
+    return persons, roles, days
+
+
+# Cada solver regresa el costo, si se probó óptimo, cuántas evaluaciones hizo y la traza del mejor costo
+def run_branch_and_bound(schedule, seed, time_limit):
+    result = branch_and_bound(schedule, time_limit=time_limit)
+    return result['cost'], result['optimal'], result['nodes'], result['trace']
+
+
+def run_annealing(schedule, seed, time_limit):
+    _, cost, _, trace = simulated_annealing(schedule, random.Random(seed), time_limit=time_limit)
+    return cost, None, trace[-1]['step'], trace
+
+
+def run_adaptive_annealing(schedule, seed, time_limit):
+    _, cost, _, trace = simulated_annealing(schedule, random.Random(seed), init_temp='auto', steps=50000,
+                                            reheat_after=5000, time_limit=time_limit)
+    return cost, None, trace[-1]['step'], trace
+
+
+def run_parallel_annealing(schedule, seed, time_limit):
+    _, cost, _, stats = parallel_annealing(schedule, chains=PARALLEL_CHAINS, seed=seed,
+                                           exchange_every=PARALLEL_EXCHANGE_EVERY, workers=PARALLEL_WORKERS,
+                                           time_limit=time_limit)
+    return cost, None, sum(chain['steps'] for chain in stats), merge_traces(stats)
+
+
+# Una traza para todas las cadenas: los puntos de las rondas en orden de tiempo, con los pasos de todas las
+# cadenas hasta ese momento, cada vez que baja el mejor costo de la corrida
+def merge_traces(stats):
+    points = sorted(((point['time'], index, point) for index, chain in enumerate(stats) for point in chain['trace']),
+                    key=lambda item: item[:2])
+    steps = [0] * len(stats)
+    best = float('inf')
+    trace = []
+    for _, index, point in points:
+        steps[index] = point['step']
+        if point['best'] < best:
+            best = point['best']
+            trace.append({'step': sum(steps), 'time': point['time'], 'best': best})
+    return trace
+
+
+def run_calculate_cost(schedule, seed, time_limit):
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    best = float('inf')
+    trace = []
+    for step in range(1, COST_EVALUATIONS + 1):
+        cost, _ = schedule.calculate_cost(init_plan(schedule, rng))
+        if cost < best:
+            best = cost
+            trace.append({'step': step, 'time': time.perf_counter() - start, 'best': best})
+    return best, None, COST_EVALUATIONS, trace
+
+
+SOLVERS = {
+    'branch_and_bound': run_branch_and_bound,
+    'recocido': run_annealing,
+    'recocido_adaptativo': run_adaptive_annealing,
+    'recocido_paralelo': run_parallel_annealing,
+    'calculate_cost': run_calculate_cost,
+}
+
+
+# Envolver Schedule.calculate_cost mientras dura el bloque para medir cada llamada con cProfile o
+# tracemalloc. tracemalloc solo se activa dentro de cada llamada para no frenar al resto del solver.
+@contextmanager
+def profile_calculate_cost(mode):
+    original = Schedule.calculate_cost
+    report = {'modo': mode, 'llamadas': 0}
+
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+
+        def wrapper(self, plan):
+            report['llamadas'] += 1
+            profiler.enable()
+            try:
+                return original(self, plan)
+            finally:
+                profiler.disable()
+
+    elif mode == 'tracemalloc':
+        report['pico_bytes'] = 0
+
+        def wrapper(self, plan):
+            report['llamadas'] += 1
+            tracemalloc.start()
+            try:
+                return original(self, plan)
+            finally:
+                report['pico_bytes'] = max(report['pico_bytes'], tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+
+    else:
+        raise ValueError(f"Modo de perfil desconocido {mode!r}")
+
+    Schedule.calculate_cost = wrapper
+    try:
+        yield report
+    finally:
+        Schedule.calculate_cost = original
+        if mode == 'cprofile':
+            report['funciones'] = top_functions(profiler)
+
+
+# Las funciones con más tiempo acumulado de un cProfile
+def top_functions(profiler, limit=10):
+    stats = pstats.Stats(profiler).stats
+    ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [{'funcion': f"{file_name}:{line}({name})", 'llamadas': calls, 'tiempo_propio': own,
+             'tiempo_acumulado': cumulative}
+            for (file_name, line, name), (_, calls, own, cumulative, _) in ranked]
+
+
+def peak_memory_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB y macOS en bytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+# Correr un caso con un solver; se llama en un proceso nuevo para que la memoria pico sea solo suya
+def run_case(case, solver, seed, time_limit, profile=None, load=1.0):
+    persons, roles, days = case
+    config = synthetic_config(persons, roles, days, seed, load)
+    schedule = build_schedule(config)
+    initial_memory = peak_memory_kb()
+
+    start = time.perf_counter()
+    if profile:
+        with profile_calculate_cost(profile) as report:
+            cost, optimal, evaluations, trace = SOLVERS[solver](schedule, seed, time_limit)
+    else:
+        report = None
+        cost, optimal, evaluations, trace = SOLVERS[solver](schedule, seed, time_limit)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'caso': config['sitio'],
+        'solver': solver,
+        'personas': persons,
+        'roles': roles,
+        'dias': days,
+        'carga': load,
+        'semilla': seed,
+        'costo': cost,
+        'optimo': optimal,
+        'tiempo': elapsed,
+        'evaluaciones': evaluations,
+        'evaluaciones_por_segundo': evaluations / elapsed if elapsed else None,
+        'memoria_inicial_kb': initial_memory,
+        'memoria_pico_kb': peak_memory_kb(),
+        'traza': [[round(point['time'], 4), point['best']] for point in trace],
+        'perfil': report,
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Correr todos los casos con todos los solvers, uno a la vez para que no compitan por el CPU, y
+# escribir cada resultado como una línea JSON en cuanto termina
+def run_benchmark(cases, solvers, output, seed=0, time_limit=TIME_LIMIT, profile=None, load=1.0):
+    for solver in solvers:
+        if solver not in SOLVERS:
+            raise ValueError(f"Solver desconocido {solver!r}")
+    environment = {'commit': current_commit(), 'python': platform.python_version()}
+    records = []
+    for case in cases:
+        for solver in solvers:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                record = executor.submit(run_case, case, solver, seed, time_limit, profile, load).result()
+            record.update(environment)
+            records.append(record)
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+            output.flush()
+    return records
+
+
+def load_results(file_path):
+    with open(file_path, 'r') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+# Comparar dos corridas del benchmark (p. ej. de dos commits) caso por caso
+def compare(base, new):
+    base_by_key = {(record['caso'], record['solver'], record['carga']): record for record in base}
+    rows = []
+    for record in new:
+        old = base_by_key.get((record['caso'], record['solver'], record['carga']))
+        if old is None:
+            continue
+        rows.append({
+            'caso': record['caso'],
+            'solver': record['solver'],
+            'costo': (old['costo'], record['costo']),
+            'tiempo': (old['tiempo'], record['tiempo']),
+            'aceleracion': old['tiempo'] / record['tiempo'] if record['tiempo'] else None,
+        })
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Medir los solvers del horario con casos sintéticos")
+    parser.add_argument('-o', '--output', help="archivo JSONL de resultados (por defecto la salida estándar)")
+    parser.add_argument('-c', '--casos', help="casos PERSONASxROLESxDIAS separados por comas, p. ej. 5x3x31,8x4x30")
+    parser.add_argument('-s', '--solvers', default=','.join(SOLVERS), help="solvers separados por comas")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--carga', type=float, default=1.0, help="trabajo entre capacidad de las personas")
+    parser.add_argument('-t', '--tiempo', type=float, default=TIME_LIMIT, help="segundos máximos por solver")
+    parser.add_argument('--perfil', choices=['cprofile', 'tracemalloc'],
+                        help="medir cada llamada a Schedule.calculate_cost")
+    parser.add_argument('--comparar', help="resultados JSONL de otra corrida para comparar")
+    args = parser.parse_args()
+
+    cases = [parse_case(text) for text in args.casos.split(',')] if args.casos else DEFAULT_CASES
+    solvers = args.solvers.split(',')
+    if args.output:
+        with open(args.output, 'w') as output:
+            records = run_benchmark(cases, solvers, output, args.semilla, args.tiempo, args.perfil, args.carga)
+    else:
+        records = run_benchmark(cases, solvers, sys.stdout, args.semilla, args.tiempo, args.perfil, args.carga)
+
+    if args.comparar:
+        for row in compare(load_results(args.comparar), records):
+            speedup = f"{row['aceleracion']:.2f}x" if row['aceleracion'] else '-'
+            print(f"{row['caso']:<24} {row['solver']:<20} costo {row['costo'][0]} -> {row['costo'][1]}  "
+                  f"tiempo {row['tiempo'][0]:.3f}s -> {row['tiempo'][1]:.3f}s ({speedup})", file=sys.stderr)
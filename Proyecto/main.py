@@ -1,5 +1,6 @@
 import json
-from backtracking import backtracking
+from backtracking import branch_and_bound, TIME_LIMIT
+from parallel_annealing import parallel_annealing
 from schedule import Schedule
 from simulated_annealing import simulated_annealing
 
@@ -11,6 +12,7 @@ def load_config(file_path):
 
 # Mostrar el horario
 def show_plan(schedule, best_plan, best_cost, best_penalties):
+    best_plan = schedule.as_plan(best_plan)
     for day in range(1, schedule.n_days + 1):
         date = schedule.month_days[day - 1].strftime('%d-%m-%Y')
         print(f"Día {date}:")
@@ -25,7 +27,26 @@ def show_plan(schedule, best_plan, best_cost, best_penalties):
         print(f"  - {key}: {value} penalización(es)")
 
 
-def solve_schedule(config):
+# Penalizar si alguna hora de alimentación no queda cubierta por ningún rol.
+# Es una clase de módulo (no un closure) para que el Schedule pueda enviarse a otros procesos.
+class NoAlimentarAnimales:
+    def __init__(self, alimentacion_animales):
+        self.alimentacion_animales = alimentacion_animales
+
+    def __call__(self, schedule, day, plan):
+        for animal, horas in self.alimentacion_animales.items():
+            for hora in horas:
+                if not any(hora in range(schedule.roles[rol][0], (schedule.roles[rol][1] or 24)) for rol in
+                           schedule.roles):
+                    return True
+        return False
+
+    def batch(self, schedule, plans):
+        # Solo depende de los horarios de los roles, no de quién está asignado
+        return self(schedule, 1, None)
+
+
+def build_schedule(config, history=None):
     num_personas = config['num_personas']
     max_dias_mes = config['max_dias_mes']
     max_dias_semana = config['max_dias_semana']
@@ -34,33 +55,77 @@ def solve_schedule(config):
     mes = config['mes']
     ano = config['ano']
 
-    s = Schedule(num_personas, max_dias_mes, max_dias_semana, dias_descanso_cambio_turno, roles, ano, mes)
+    s = Schedule(num_personas, max_dias_mes, max_dias_semana, dias_descanso_cambio_turno, roles, ano, mes,
+                 rules=config.get('reglas'), history=history or config.get('historial'))
 
-    # If this configuration has specific animal feeding logic
+    # Older configurations describe the animal feeding hours with a custom penalty instead of a rule
     if 'alimentacion_animales' in config:
         alimentacion_animales = config['alimentacion_animales']
 
-        def no_alimentar_animales(schedule, day, plan):
-            for animal, horas in alimentacion_animales.items():
-                for hora in horas:
-                    if not any(hora in range(schedule.roles[rol][0], (schedule.roles[rol][1] or 24)) for rol in
-                               schedule.roles):
-                        return True
-            return False
-
         custom_penalties = {
-            'Animal no alimentado': [20, no_alimentar_animales]
+            'Animal no alimentado': [20, NoAlimentarAnimales(alimentacion_animales)]
         }
         s.custom_penalties = custom_penalties  # Add custom penalties to schedule
 
-    try:
-        print("Trying Backtracking")
-        best_plan, best_cost, best_penalties = backtracking(s)
-    except:
-        print("Trying Simulated Annealing")
-        best_plan, best_cost, best_penalties = simulated_annealing(s)
+    return s
+
 
-    show_plan(s, best_plan, best_cost, best_penalties)
+# Opciones del recocido simulado en la llave "recocido" de la configuración y su nombre en simulated_annealing
+ANNEALING_OPTIONS = {
+    'temp_inicial': 'init_temp',
+    'enfriamiento': 'cooling',
+    'temp_minima': 'min_temp',
+    'pasos': 'steps',
+    'paciencia': 'patience',
+    'recalentar': 'reheat_after',
+    'max_recalentamientos': 'max_reheats',
+    'tiempo_limite': 'time_limit',
+}
+
+
+def annealing_options(config):
+    options = {}
+    for key, value in config.get('recocido', {}).items():
+        if key not in ANNEALING_OPTIONS:
+            raise ValueError(f"Opción de recocido desconocida {key!r}")
+        options[ANNEALING_OPTIONS[key]] = value
+    return options
+
+
+# Branch and bound primero; si no cierra la brecha en el tiempo dado, recocido simulado
+def find_plan(s, config, verbose=True):
+    log = print if verbose else (lambda *args: None)
+    log("Trying Branch and Bound")
+    result = branch_and_bound(s, time_limit=config.get('tiempo_limite', TIME_LIMIT))
+    if not result['optimal']:
+        log(f"Time limit reached: cost {result['cost']}, lower bound {result['lower_bound']} (gap {result['gap']})")
+        chains = config.get('cadenas', 1)
+        options = annealing_options(config)
+        # El recocido no puede bajar de la cota del branch and bound; si la alcanza ya es óptimo
+        options['lower_bound'] = result['lower_bound']
+        if chains > 1:
+            log(f"Trying Parallel Simulated Annealing ({chains} chains)")
+            plan, cost, penalties, stats = parallel_annealing(s, chains=chains, seed=config.get('semilla', 0),
+                                                              exchange_every=config.get('intercambio_cada'),
+                                                              lower_bound=options['lower_bound'],
+                                                              time_limit=options.get('time_limit'))
+            for chain in stats:
+                log(f"  Chain seed {chain['seed']}: best {chain['best_cost']}, {chain['steps']} steps, "
+                    f"{chain['swaps']} swaps, {chain['time']:.2f}s")
+        else:
+            log("Trying Simulated Annealing")
+            plan, cost, penalties, trace = simulated_annealing(s, **options)
+            log(f"  {trace[-1]['step']} steps, best {trace[-1]['best']}, {trace[-1]['time']:.2f}s")
+        if cost < result['cost']:
+            result.update(plan=plan, cost=cost, penalties=penalties, gap=cost - result['lower_bound'],
+                          optimal=cost <= result['lower_bound'])
+    return result
+
+
+def solve_schedule(config):
+    s = build_schedule(config)
+    result = find_plan(s, config)
+    show_plan(s, result['plan'], result['cost'], result['penalties'])
 
 
 if __name__ == '__main__':
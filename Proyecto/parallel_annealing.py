@@ -0,0 +1,122 @@
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from simulated_annealing import INIT_TEMP, MIN_TEMP, anneal, init_plan
+
+# Temperatura inicial de la cadena más fría cuando hay intercambio de réplicas; las demás se reparten
+# geométricamente entre esta e INIT_TEMP, así que con cualquier número de cadenas todas empiezan arriba de
+# MIN_TEMP y dan pasos
+LADDER_FLOOR = MIN_TEMP * 10
+
+
+# Temperatura inicial de la cadena index de chains
+def ladder_temp(index, chains):
+    if chains == 1:
+        return INIT_TEMP
+    return INIT_TEMP * (LADDER_FLOOR / INIT_TEMP) ** (index / (chains - 1))
+
+
+# Correr un tramo de una cadena en un proceso del pool. deadline es absoluto (time.time(), que comparten
+# todos los procesos): con más cadenas que procesos los tramos en cola empiezan tarde y un límite relativo
+# se pasaría; si ya pasó, el tramo no da ningún paso.
+def run_segment(schedule, plan, temp, rng_state, max_steps, lower_bound=None, deadline=None):
+    start = time.perf_counter()
+    rng = random.Random()
+    rng.setstate(rng_state)
+    evaluator = schedule.evaluator(plan)
+    time_limit = None if deadline is None else deadline - time.time()
+    result = anneal(evaluator, temp, rng, max_steps, lower_bound=lower_bound, time_limit=time_limit)
+    del result['trace']
+    result['plan'] = evaluator.plan
+    result['cost'] = evaluator.cost
+    result['rng_state'] = rng.getstate()
+    result['time'] = time.perf_counter() - start
+    return result
+
+
+# Intercambio de réplicas: cadenas vecinas en temperatura intercambian sus planes con el criterio de Metropolis
+def exchange_replicas(chains, rng, offset):
+    ladder = sorted((chain for chain in chains if chain['temp'] > MIN_TEMP), key=lambda chain: chain['temp'])
+    for i in range(offset, len(ladder) - 1, 2):
+        cold, hot = ladder[i], ladder[i + 1]
+        exponent = (1 / cold['temp'] - 1 / hot['temp']) * (cold['cost'] - hot['cost'])
+        if exponent >= 0 or rng.random() < math.exp(exponent):
+            cold['plan'], hot['plan'] = hot['plan'], cold['plan']
+            cold['cost'], hot['cost'] = hot['cost'], cold['cost']
+            cold['swaps'] += 1
+            hot['swaps'] += 1
+
+
+# Recocido simulado con varias cadenas independientes en un pool de procesos. Cada cadena tiene su
+# propia semilla derivada de seed, así que dos corridas con la misma semilla dan el mismo resultado.
+# Con exchange_every las cadenas empiezan en temperaturas escalonadas y cada exchange_every pasos
+# intercambian planes entre temperaturas vecinas (parallel tempering). Con lower_bound todas las cadenas
+# se detienen cuando alguna llega a la cota, y time_limit limita el tiempo de reloj de toda la corrida.
+# Las estadísticas de cada cadena llevan en trace su mejor costo al final de cada ronda, con los pasos y el
+# tiempo desde el inicio de la corrida.
+def parallel_annealing(schedule, chains=4, seed=0, exchange_every=None, workers=None, lower_bound=None,
+                       time_limit=None):
+    start = time.perf_counter()
+    deadline = None if time_limit is None else time.time() + time_limit
+    master = random.Random(seed)
+    states = []
+    for i in range(chains):
+        chain_seed = master.randrange(2 ** 32)
+        rng = random.Random(chain_seed)
+        plan = init_plan(schedule, rng)
+        cost, penalties = schedule.calculate_cost(plan)
+        temp = ladder_temp(i, chains) if exchange_every else INIT_TEMP
+        states.append({
+            'seed': chain_seed,
+            'initial_temp': temp,
+            'temp': temp,
+            'plan': plan,
+            'cost': cost,
+            'rng_state': rng.getstate(),
+            'best_plan': plan.copy(),
+            'best_cost': cost,
+            'best_penalties': penalties,
+            'steps': 0,
+            'accepted': 0,
+            'swaps': 0,
+            'time': 0.0,
+            'trace': [{'step': 0, 'time': 0.0, 'best': cost}],
+        })
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        round_number = 0
+        while True:
+            active = [chain for chain in states if chain['temp'] > MIN_TEMP]
+            if not active or (deadline is not None and time.time() >= deadline):
+                break
+            if lower_bound is not None and min(chain['best_cost'] for chain in states) <= lower_bound:
+                break
+            futures = [executor.submit(run_segment, schedule, chain['plan'], chain['temp'], chain['rng_state'],
+                                       exchange_every, lower_bound, deadline) for chain in active]
+            # Los resultados se recogen en el orden de las cadenas para que la corrida sea reproducible
+            for chain, future in zip(active, futures):
+                result = future.result()
+                chain['plan'] = result['plan']
+                chain['cost'] = result['cost']
+                chain['temp'] = result['temp']
+                chain['rng_state'] = result['rng_state']
+                chain['steps'] += result['steps']
+                chain['accepted'] += result['accepted']
+                chain['time'] += result['time']
+                if result['best_cost'] < chain['best_cost']:
+                    chain['best_plan'] = result['best_plan']
+                    chain['best_cost'] = result['best_cost']
+                    chain['best_penalties'] = result['best_penalties']
+                chain['trace'].append({'step': chain['steps'], 'time': time.perf_counter() - start,
+                                       'best': chain['best_cost']})
+
+            if exchange_every:
+                exchange_replicas(states, master, round_number % 2)
+            round_number += 1
+
+    best = min(states, key=lambda chain: chain['best_cost'])
+    stats = [{key: chain[key] for key in ('seed', 'initial_temp', 'best_cost', 'cost', 'steps', 'accepted', 'swaps',
+                                          'time', 'trace')} for chain in states]
+    return best['best_plan'], best['best_cost'], best['best_penalties'], stats
@@ -0,0 +1,103 @@
+from array import array
+
+# Valor de una celda sin persona asignada
+UNASSIGNED = -1
+
+
+# Plan compacto: una celda por (día, rol) con el número de la persona asignada, guardado en un
+# arreglo plano de enteros pequeños (día mayor, rol menor)
+class Plan:
+    def __init__(self, n_days, roles, cells=None):
+        self.n_days = n_days
+        self.roles = list(roles)
+        self.n_roles = len(self.roles)
+        self.role_index = {role: i for i, role in enumerate(self.roles)}
+        if cells is None:
+            cells = array('h', [UNASSIGNED]) * (n_days * self.n_roles)
+        self.cells = cells
+
+    @classmethod
+    def from_dict(cls, plan, roles):
+        # Convertir el formato dict[día][rol] -> persona
+        roles = list(roles)
+        cells = array('h', (UNASSIGNED if plan[day][role] is None else plan[day][role]
+                            for day in range(1, len(plan) + 1) for role in roles))
+        return cls(len(plan), roles, cells)
+
+    @classmethod
+    def frombytes(cls, n_days, roles, data):
+        cells = array('h')
+        cells.frombytes(data)
+        return cls(n_days, roles, cells)
+
+    def to_dict(self):
+        return {day: self[day].copy() for day in range(1, self.n_days + 1)}
+
+    def tobytes(self):
+        return self.cells.tobytes()
+
+    def get(self, day, role_index):
+        return self.cells[(day - 1) * self.n_roles + role_index]
+
+    def set(self, day, role_index, person):
+        self.cells[(day - 1) * self.n_roles + role_index] = person
+
+    def copy(self):
+        new_plan = Plan.__new__(Plan)
+        new_plan.n_days = self.n_days
+        new_plan.roles = self.roles
+        new_plan.n_roles = self.n_roles
+        new_plan.role_index = self.role_index
+        new_plan.cells = array('h', self.cells)
+        return new_plan
+
+    # Acceso compatible con el formato dict: plan[día][rol]
+    def __getitem__(self, day):
+        if not 1 <= day <= self.n_days:
+            raise KeyError(day)
+        return PlanDay(self, day)
+
+    def __iter__(self):
+        return iter(range(1, self.n_days + 1))
+
+    def __len__(self):
+        return self.n_days
+
+    def keys(self):
+        return range(1, self.n_days + 1)
+
+    def items(self):
+        return ((day, self[day]) for day in range(1, self.n_days + 1))
+
+    def __eq__(self, other):
+        if not isinstance(other, Plan):
+            return NotImplemented
+        return self.roles == other.roles and self.cells == other.cells
+
+    __hash__ = None  # Es mutable; para usarlo como llave se usa tobytes()
+
+
+# Vista de un día de un Plan que se comporta como dict[rol] -> persona
+class PlanDay:
+    def __init__(self, plan, day):
+        self.plan = plan
+        self.offset = (day - 1) * plan.n_roles
+
+    def __getitem__(self, role):
+        person = self.plan.cells[self.offset + self.plan.role_index[role]]
+        return None if person == UNASSIGNED else person
+
+    def __setitem__(self, role, person):
+        self.plan.cells[self.offset + self.plan.role_index[role]] = UNASSIGNED if person is None else person
+
+    def __iter__(self):
+        return iter(self.plan.roles)
+
+    def keys(self):
+        return list(self.plan.roles)
+
+    def items(self):
+        return [(role, self[role]) for role in self.plan.roles]
+
+    def copy(self):
+        return dict(self.items())
@@ -0,0 +1,160 @@
+import calendar
+import copy
+import time
+
+from backtracking import branch_and_bound
+from main import build_schedule
+from plan import UNASSIGNED
+from rules import UNAVAILABLE
+
+# Costo de asignar a alguien en un día en que no está disponible
+UNAVAILABLE_COST = 100
+UNAVAILABLE_NAME = 'Persona no disponible'
+# Tiempo máximo (segundos) para reparar un plan
+RESOLVE_TIME_LIMIT = 1
+
+
+# Aplicar a una configuración los cambios de diff:
+#   "desde"          día a partir del cual se puede cambiar el plan (por defecto 1)
+#   "no_disponible"  {persona (1..n): [días]} días en que alguien ya no puede trabajar
+#   "bajas"          [personas (1..n)] que ya no trabajan a partir de "desde"
+#   "roles"          {rol: [inicio, fin]} nuevos horarios de los roles
+def apply_diff(config, diff):
+    config = copy.deepcopy(config)
+    n_days = calendar.monthrange(config['ano'], config['mes'])[1]
+    start = diff.get('desde', 1)
+
+    unavailable = {int(person): set(days) for person, days in diff.get('no_disponible', {}).items()}
+    for person in diff.get('bajas', []):
+        unavailable.setdefault(person, set()).update(range(start, n_days + 1))
+
+    # Todas las ausencias van en una sola regla, junto con las de re-planeaciones anteriores
+    rules = config.setdefault('reglas', [])
+    rule = next((rule for rule in rules if rule['nombre'] == UNAVAILABLE_NAME), None)
+    if rule is None:
+        rule = {'nombre': UNAVAILABLE_NAME, 'tipo': UNAVAILABLE, 'costo': UNAVAILABLE_COST, 'dias': {}}
+        rules.append(rule)
+    elif not isinstance(rule['dias'], dict):
+        rule['dias'] = {str(person): list(rule['dias']) for person in rule.pop('personas')}
+    for person, days in unavailable.items():
+        rule['dias'][str(person)] = sorted(days.union(rule['dias'].get(str(person), [])))
+
+    for role, hours in diff.get('roles', {}).items():
+        if role not in config['roles']:
+            raise ValueError(f"Rol desconocido {role!r}")
+        config['roles'][role] = list(hours)
+    return config
+
+
+# Días a reparar: las semanas completas donde alguien quedó asignado sin estar disponible
+def affected_days(schedule, plan, start):
+    n_roles = len(schedule.role_names)
+    weeks = set()
+    for rule in schedule.rules:
+        if rule['kind'] != UNAVAILABLE:
+            continue
+        for day in range(start, schedule.n_days + 1):
+            for index in range(n_roles):
+                # Las celdas sin asignar (UNASSIGNED) no tienen a nadie que revisar
+                person = plan.cells[(day - 1) * n_roles + index]
+                if person != UNASSIGNED and rule['blocked'][day - 1][person]:
+                    weeks.add(schedule.week_of_day[day - 1])
+    return [day for day in range(start, schedule.n_days + 1) if schedule.week_of_day[day - 1] in weeks]
+
+
+def count_changes(old_plan, new_plan):
+    return sum(1 for old, new in zip(old_plan.cells, new_plan.cells) if old != new)
+
+
+# Búsqueda local sobre las celdas de los días dados: reasignaciones e intercambios que bajan el costo,
+# o que a igual costo dejan el plan más parecido al original
+def local_repair(schedule, plan, old_plan, days, deadline):
+    evaluator = schedule.evaluator(plan.copy())
+    n_roles = len(schedule.role_names)
+    cells = [(day, role) for day in days for role in schedule.role_names]
+
+    def moved(day, role, person):
+        return person != old_plan.cells[(day - 1) * n_roles + schedule.role_index[role]]
+
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for day, role in cells:
+            current = evaluator.plan[day][role]
+            for person in range(schedule.persons):
+                if person == current:
+                    continue
+                delta = evaluator.delta(day, role, person)
+                if (delta, moved(day, role, person) - moved(day, role, current)) < (0, 0):
+                    evaluator.apply(day, role, person)
+                    current = person
+                    improved = True
+
+        # Intercambiar las personas de dos celdas no cambia los totales del mes
+        for i, (day, role) in enumerate(cells):
+            for other_day, other_role in cells[i + 1:]:
+                first, second = evaluator.plan[day][role], evaluator.plan[other_day][other_role]
+                if first == second:
+                    continue
+                delta = evaluator.delta(day, role, second)
+                evaluator.apply(day, role, second)
+                delta += evaluator.delta(other_day, other_role, first)
+                change = (moved(day, role, second) + moved(other_day, other_role, first)
+                          - moved(day, role, first) - moved(other_day, other_role, second))
+                if (delta, change) < (0, 0):
+                    evaluator.apply(other_day, other_role, first)
+                    improved = True
+                else:
+                    evaluator.apply(day, role, first)
+            if time.perf_counter() >= deadline:
+                break
+
+    return evaluator.plan
+
+
+# Volver a resolver un plan después de un cambio pequeño en la configuración. Solo se tocan los días
+# afectados (ver affected_days); el resto queda igual. Regresa el nuevo plan y la lista de cambios.
+def resolve(config, previous_plan, diff, history=None, method='exact', time_limit=RESOLVE_TIME_LIMIT):
+    start_time = time.perf_counter()
+    deadline = start_time + time_limit
+
+    new_config = apply_diff(config, diff)
+    s = build_schedule(new_config, history)
+    old_plan = s.as_plan(previous_plan).copy()
+    previous_cost, _ = s.calculate_cost(old_plan)
+
+    days = affected_days(s, old_plan, diff.get('desde', 1))
+    plan = old_plan
+    optimal = None
+    if days:
+        plan = local_repair(s, old_plan, old_plan, days, deadline)
+
+        if method == 'exact':
+            # Solo las celdas de los días afectados quedan libres para el branch and bound
+            fixed = old_plan.copy()
+            for day in days:
+                for index in range(len(s.role_names)):
+                    fixed.set(day, index, UNASSIGNED)
+            # Se deja una parte del tiempo para pulir el resultado
+            budget = 0.8 * max(0, deadline - time.perf_counter())
+            result = branch_and_bound(s, time_limit=budget, plan=plan, fixed=fixed, prefer=old_plan)
+            optimal = result['optimal']
+            if (result['cost'], count_changes(old_plan, result['plan'])) < (s.calculate_cost(plan)[0],
+                                                                             count_changes(old_plan, plan)):
+                plan = local_repair(s, result['plan'], old_plan, days, deadline)
+
+    cost, penalties = s.calculate_cost(plan)
+    n_roles = len(s.role_names)
+    changes = [{'dia': index // n_roles + 1, 'rol': s.role_names[index % n_roles], 'antes': old, 'despues': new}
+               for index, (old, new) in enumerate(zip(old_plan.cells, plan.cells)) if old != new]
+    return {
+        'plan': plan,
+        'cost': cost,
+        'penalties': penalties,
+        'previous_cost': previous_cost,
+        'changes': changes,
+        'affected_days': days,
+        'optimal': optimal,
+        'time': time.perf_counter() - start_time,
+        'config': new_config,
+    }
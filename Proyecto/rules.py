@@ -0,0 +1,152 @@
+# Reglas de penalización declarativas, definidas en la llave "reglas" de la configuración.
+# Cada regla tiene "nombre", "tipo" y "costo" (por cada vez que se incumple):
+#
+#   cobertura_horas      cada hora de "horas" (lista, o dict de listas por grupo) debe quedar dentro del
+#                        horario de algún rol; cuenta 1 por día ("dias" opcional, por defecto todos) con
+#                        alguna hora sin cubrir
+#   tope_persona         nadie de "personas" (opcional, 1..n) trabaja más de "maximo" veces en el mes
+#                        los roles de "roles" (opcional); cuenta 1 por cada vez por encima del máximo
+#   secuencia_prohibida  la misma persona no puede tener el rol "de" y, "separacion" días después
+#                        (por defecto 1), el rol "a"; cuenta 1 por cada ocurrencia
+#   no_disponible        las personas de "personas" (1..n) no pueden trabajar los días de "dias" (o
+#                        "dias" es un dict {persona: [días]}); cuenta 1 por cada asignación en esos días
+#
+# Se compilan una sola vez en tablas por día, persona y rol para evaluarlas rápido.
+
+COVERAGE = 'cobertura_horas'
+PERSON_CAP = 'tope_persona'
+FORBIDDEN_SEQUENCE = 'secuencia_prohibida'
+UNAVAILABLE = 'no_disponible'
+
+
+def covers(schedule_role, hour):
+    start, end = schedule_role
+    return hour in range(start, end or 24)
+
+
+def compile_rules(schedule, rules):
+    compiled = []
+    for rule in rules:
+        if any(other['name'] == rule['nombre'] for other in compiled):
+            raise ValueError(f"Nombre de regla repetido {rule['nombre']!r}")
+        kind = rule.get('tipo')
+        base = {'name': rule['nombre'], 'cost': rule['costo'], 'kind': kind}
+
+        if kind == COVERAGE:
+            hours = rule['horas']
+            if isinstance(hours, dict):
+                hours = [hour for group in hours.values() for hour in group]
+            uncovered = any(not any(covers(schedule.roles[role], hour) for role in schedule.roles)
+                            for hour in hours)
+            days = set(rule.get('dias', range(1, schedule.n_days + 1)))
+            # No depende de quién trabaja, así que se resuelve aquí para cada día
+            base['flags'] = [uncovered and day in days for day in range(1, schedule.n_days + 1)]
+
+        elif kind == PERSON_CAP:
+            persons = rule.get('personas')
+            roles = rule.get('roles', schedule.role_names)
+            base['persons'] = [persons is None or person + 1 in persons for person in range(schedule.persons)]
+            base['roles'] = [role in roles for role in schedule.role_names]
+            base['max'] = rule['maximo']
+            base['selective'] = persons is not None
+            _check_roles(schedule, roles, rule)
+
+        elif kind == FORBIDDEN_SEQUENCE:
+            _check_roles(schedule, [rule['de'], rule['a']], rule)
+            base['first'] = schedule.role_index[rule['de']]
+            base['second'] = schedule.role_index[rule['a']]
+            base['gap'] = rule.get('separacion', 1)
+            if base['gap'] < 0 or (base['gap'] == 0 and base['first'] == base['second']):
+                raise ValueError(f"Separación inválida en la regla {rule['nombre']!r}")
+
+        elif kind == UNAVAILABLE:
+            if isinstance(rule['dias'], dict):
+                days = {int(person): set(days) for person, days in rule['dias'].items()}
+            else:
+                days = {person: set(rule['dias']) for person in rule['personas']}
+            base['blocked'] = [[day in days.get(person + 1, ()) for person in range(schedule.persons)]
+                               for day in range(1, schedule.n_days + 1)]
+            base['selective'] = True
+
+        else:
+            raise ValueError(f"Tipo de regla desconocido {kind!r} en {rule['nombre']!r}")
+
+        compiled.append(base)
+    return compiled
+
+
+def _check_roles(schedule, roles, rule):
+    for role in roles:
+        if role not in schedule.role_index:
+            raise ValueError(f"Rol desconocido {role!r} en la regla {rule['nombre']!r}")
+
+
+# Conteo de cada regla para un Plan completo
+def rule_counts(schedule, cells):
+    n_roles = len(schedule.role_names)
+    counts = []
+    for rule in schedule.rules:
+        if rule['kind'] == COVERAGE:
+            counts.append(sum(rule['flags']))
+
+        elif rule['kind'] == PERSON_CAP:
+            worked = person_cap_counts(schedule, rule, cells)
+            counts.append(sum(max(0, days - rule['max'])
+                              for person, days in enumerate(worked) if rule['persons'][person]))
+
+        elif rule['kind'] == UNAVAILABLE:
+            counts.append(sum(1 for index, person in enumerate(cells)
+                              if person >= 0 and rule['blocked'][index // n_roles][person]))
+
+        else:
+            first, second, gap = rule['first'], rule['second'], rule['gap']
+            counts.append(sum(1 for day in range(schedule.n_days - gap)
+                              if _same(cells[day * n_roles + first], cells[(day + gap) * n_roles + second])))
+    return counts
+
+
+# Veces que cada persona trabaja en los roles de una regla tope_persona
+def person_cap_counts(schedule, rule, cells):
+    n_roles = len(schedule.role_names)
+    worked = [0] * schedule.persons
+    for index, person in enumerate(cells):
+        if person >= 0 and rule['roles'][index % n_roles]:
+            worked[person] += 1
+    return worked
+
+
+# Cambio en el conteo de una regla si la celda (day, index) pasa de old a new.
+# worked son los conteos de person_cap_counts para las reglas tope_persona.
+def rule_delta(schedule, rule, cells, day, index, old, new, worked=None):
+    kind = rule['kind']
+    if kind == COVERAGE:
+        return 0
+
+    if kind == PERSON_CAP:
+        if not rule['roles'][index]:
+            return 0
+        delta = 0
+        if old >= 0 and rule['persons'][old] and worked[old] > rule['max']:
+            delta -= 1
+        if new >= 0 and rule['persons'][new] and worked[new] >= rule['max']:
+            delta += 1
+        return delta
+
+    if kind == UNAVAILABLE:
+        blocked = rule['blocked'][day - 1]
+        return (new >= 0 and blocked[new]) - (old >= 0 and blocked[old])
+
+    n_roles = len(schedule.role_names)
+    delta = 0
+    if index == rule['first'] and day + rule['gap'] <= schedule.n_days:
+        partner = cells[(day - 1 + rule['gap']) * n_roles + rule['second']]
+        delta += _same(new, partner) - _same(old, partner)
+    if index == rule['second'] and day - rule['gap'] >= 1:
+        partner = cells[(day - 1 - rule['gap']) * n_roles + rule['first']]
+        delta += _same(new, partner) - _same(old, partner)
+    return delta
+
+
+def _same(person, other):
+    # Las celdas sin asignar (negativas) nunca forman una secuencia
+    return person >= 0 and person == other
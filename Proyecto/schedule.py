@@ -1,9 +1,23 @@
 import calendar
 from datetime import datetime
 
+from plan import Plan
+from rules import PERSON_CAP, compile_rules, person_cap_counts, rule_counts, rule_delta
+
+# Nombres de las penalizaciones base
+PENALTY_MONTH = 'Exceso de días trabajados en el mes'
+PENALTY_REST = 'Descanso insuficiente entre turnos y otros roles'
+PENALTY_WEEK = 'Exceso de días trabajados en una semana'
+PENALTY_DOUBLE = 'Doble rol en el mismo día'
+
+# Roles involucrados en el descanso obligatorio después del turno de noche
+NIGHT_ROLE = 'operador_noche'
+DAY_ROLES = ('auxiliar', 'operador_dia')
+
 
 class Schedule:
-    def __init__(self, persons, max_month_days, max_week_days, rest_days, roles, year, month, custom_penalties=None):
+    def __init__(self, persons, max_month_days, max_week_days, rest_days, roles, year, month, custom_penalties=None,
+                 rules=None, history=None):
         # número de personas disponibles
         self.persons = persons
         # Parámetros de restricciones personalizadas
@@ -12,67 +26,111 @@ class Schedule:
         self.rest_days = rest_days
         # Datos del horario y restricciones de turnos
         self.roles = roles
+        # Índice de cada rol dentro de un Plan compacto
+        self.role_names = list(roles)
+        self.role_index = {role: i for i, role in enumerate(self.role_names)}
+        # Solo vale la pena buscar descansos si existen los roles involucrados
+        self.check_rest = NIGHT_ROLE in roles and any(role in roles for role in DAY_ROLES)
         # Variables calculadas dependiendo el mes y año
         self.n_days = calendar.monthrange(year, month)[1]
-        self.month_days = [datetime(2024, 10, day) for day in range(1, self.n_days + 1)]
+        self.month_days = [datetime(year, month, day) for day in range(1, self.n_days + 1)]
+        # Semana (de lunes a domingo) a la que pertenece cada día del mes, empezando en 0
+        first_weekday = self.month_days[0].weekday()
+        self.week_of_day = [(first_weekday + day) // 7 for day in range(self.n_days)]
+        self.n_weeks = self.week_of_day[-1] + 1
+        # Estado que viene del mes anterior (ver next_history): la última asignación de cada persona
+        # como (día, rol) con día <= 0, y los días ya trabajados en la semana que sigue abierta
+        self.history_last = [None] * persons
+        self.week_carry = [0] * persons
+        if history:
+            for person, last in enumerate(history['ultima_asignacion']):
+                self.history_last[person] = tuple(last) if last else None
+            for person, days in enumerate(history['dias_semana']):
+                # Si ya se pasó del máximo, esa penalización se cobró el mes anterior; se empieza tan
+                # abajo que no se alcanza el máximo aunque trabaje todos los roles de la semana
+                self.week_carry[person] = days if days <= max_week_days else -7 * len(roles)
         if custom_penalties is None:
             self.custom_penalties = {}
         else:
             self.custom_penalties = custom_penalties
+        # Reglas declarativas de la configuración, compiladas en tablas (ver rules.py)
+        self.rules = compile_rules(self, rules or [])
+
+    def empty_plan(self):
+        return Plan(self.n_days, self.role_names)
+
+    def as_plan(self, plan):
+        # Acepta tanto un Plan como el formato dict[día][rol] -> persona
+        if isinstance(plan, Plan):
+            return plan
+        return Plan.from_dict(plan, self.role_names)
 
     def calculate_cost(self, plan):
+        plan = self.as_plan(plan)
+        cells = plan.cells
+        n_roles = len(self.role_names)
         cost = 0
         work_days = {person: 0 for person in range(self.persons)}
-        last_assignation = {person: None for person in range(self.persons)}
+        last_assignation = {person: self.history_last[person] for person in range(self.persons)}
+        worked_week_days = [{person: 0 for person in range(self.persons)} for _ in range(self.n_weeks)]
+        worked_week_days[0] = dict(enumerate(self.week_carry))
 
         penalties = {
-            'Exceso de días trabajados en el mes': 0,
-            'Descanso insuficiente entre turnos y otros roles': 0,
-            'Exceso de días trabajados en una semana': 0,
-            'Doble rol en el mismo día': 0
+            PENALTY_MONTH: 0,
+            PENALTY_REST: 0,
+            PENALTY_WEEK: 0,
+            PENALTY_DOUBLE: 0
         }
         for key in self.custom_penalties:
             penalties[key] = 0
+        for rule in self.rules:
+            penalties[rule['name']] = 0
 
         for day in range(1, self.n_days + 1):
-            worked_week_days = {person: 0 for person in range(self.persons)}
+            week_days = worked_week_days[self.week_of_day[day - 1]]
             assigned_persons = set()
 
-            for role, role_schedule in self.roles.items():
-                person = plan[day][role]
+            for index, role in enumerate(self.role_names):
+                person = cells[(day - 1) * n_roles + index]
                 work_days[person] += 1
-                worked_week_days[person] += 1
+                week_days[person] += 1
 
                 # Penalizar si la person ya está asignada a otro role en el mismo día
                 if person in assigned_persons:
                     cost += 15  # Penalización alta para evitar dobles asignaciones en el mismo día
-                    penalties['Doble rol en el mismo día'] += 1
+                    penalties[PENALTY_DOUBLE] += 1
                 assigned_persons.add(person)
 
                 # Penalizar por cambio de turno sin descanso adecuado
                 if last_assignation[person]:
-                    days_after_last = (self.month_days[day - 1] - last_assignation[person]['fecha']).days
-                    if last_assignation[person]['role'] == 'operador_noche' and role in ['auxiliar', 'operador_dia']:
-                        if days_after_last < self.rest_days:
+                    last_day, last_role = last_assignation[person]
+                    if last_role == NIGHT_ROLE and role in DAY_ROLES:
+                        if day - last_day < self.rest_days:
                             cost += 10
-                            penalties['Descanso insuficiente entre turnos y otros roles'] += 1
+                            penalties[PENALTY_REST] += 1
 
-                last_assignation[person] = {'fecha': self.month_days[day - 1], 'role': role}
-
-            # Penalizar por exceder el máximo de días por semana
-            for person, week_days in worked_week_days.items():
-                if week_days > self.max_week_days:
-                    cost += 5
-                    penalties['Exceso de días trabajados en una semana'] += 1
+                last_assignation[person] = (day, role)
 
             # Aplicar penalizaciones personalizadas
             cost, penalties = self.apply_custom_penalties(day, plan, cost, penalties)
 
+        # Penalizar por exceder el máximo de días por semana
+        for week_days in worked_week_days:
+            for person, days in week_days.items():
+                if days > self.max_week_days:
+                    cost += 5
+                    penalties[PENALTY_WEEK] += 1
+
         # Penalizar si una person excede los días de trabajo en el mes
         for person, work_days in work_days.items():
             if work_days > self.max_month_days:
                 cost += (work_days - self.max_month_days) * 2
-                penalties['Exceso de días trabajados en el mes'] += work_days - self.max_month_days
+                penalties[PENALTY_MONTH] += work_days - self.max_month_days
+
+        # Reglas declarativas
+        for rule, count in zip(self.rules, rule_counts(self, cells)):
+            cost += count * rule['cost']
+            penalties[rule['name']] += count
 
         return cost, penalties
 
@@ -84,3 +142,211 @@ class Schedule:
                 penalties[penalty_name] += 1
 
         return cost, penalties
+
+    def evaluator(self, plan):
+        return IncrementalCost(self, plan)
+
+    def next_history(self, plan):
+        # Estado con el que empieza el mes siguiente a este plan
+        plan = self.as_plan(plan)
+        n_roles = len(self.role_names)
+        last = [None if self.history_last[person] is None
+                else [self.history_last[person][0] - self.n_days, self.history_last[person][1]]
+                for person in range(self.persons)]
+        week_days = [0] * self.persons
+        open_week = self.month_days[-1].weekday() != 6
+        for day in range(1, self.n_days + 1):
+            for index, role in enumerate(self.role_names):
+                person = plan.cells[(day - 1) * n_roles + index]
+                last[person] = [day - self.n_days, role]
+                if open_week and self.week_of_day[day - 1] == self.n_weeks - 1:
+                    week_days[person] += 1
+        return {'ultima_asignacion': last, 'dias_semana': week_days}
+
+    def rest_neighbors(self, cells, person, day, role):
+        # Asignaciones de person inmediatamente antes y después de (day, role) en un Plan, solo
+        # dentro de la ventana de descanso; fuera de ella no pueden generar penalización
+        n_roles = len(self.role_names)
+        index = self.role_index[role]
+        previous = None
+        for d in range(day, max(0, day - self.rest_days), -1):
+            last = index if d == day else n_roles
+            for r in range(last - 1, -1, -1):
+                if cells[(d - 1) * n_roles + r] == person:
+                    previous = (d, self.role_names[r])
+                    break
+            if previous:
+                break
+        # Sin asignaciones cercanas en el mes, la anterior puede venir del mes pasado
+        if previous is None and self.history_last[person] and day - self.history_last[person][0] < self.rest_days:
+            previous = self.history_last[person]
+
+        following = None
+        for d in range(day, min(self.n_days, day + self.rest_days - 1) + 1):
+            first = index + 1 if d == day else 0
+            for r in range(first, n_roles):
+                if cells[(d - 1) * n_roles + r] == person:
+                    following = (d, self.role_names[r])
+                    break
+            if following:
+                break
+
+        return previous, following
+
+    def rest_violation(self, first, second):
+        # 1 si la asignación second viene muy pronto después de un turno de noche en first
+        if first is None or second is None:
+            return 0
+        if first[1] == NIGHT_ROLE and second[1] in DAY_ROLES and second[0] - first[0] < self.rest_days:
+            return 1
+        return 0
+
+
+# Evaluador incremental: mantiene los contadores de un plan y calcula el cambio exacto
+# de costo al reasignar un único (día, rol) sin recorrer todo el mes
+class IncrementalCost:
+    def __init__(self, schedule, plan):
+        self.schedule = schedule
+        # Las reasignaciones se aplican sobre este Plan (el mismo objeto si ya era un Plan)
+        self.plan = schedule.as_plan(plan)
+        self.roles = schedule.role_names
+        self.role_index = schedule.role_index
+
+        self.cost, self.penalties = schedule.calculate_cost(self.plan)
+        cells = self.plan.cells
+        n_roles = len(self.roles)
+
+        # Días trabajados en el mes, por semana y por día (para el doble rol)
+        self.work_days = [0] * schedule.persons
+        self.week_days = [[0] * schedule.persons for _ in range(schedule.n_weeks)]
+        self.week_days[0] = list(schedule.week_carry)
+        self.day_persons = [None] + [[0] * schedule.persons for _ in range(schedule.n_days)]
+        # Resultado de cada penalización personalizada por día
+        self.custom_state = [None] + [{} for _ in range(schedule.n_days)]
+        # Conteo por persona de las reglas tope_persona
+        self.rule_worked = [person_cap_counts(schedule, rule, self.plan.cells) if rule['kind'] == PERSON_CAP
+                            else None for rule in schedule.rules]
+
+        for day in range(1, schedule.n_days + 1):
+            week = schedule.week_of_day[day - 1]
+            for index in range(n_roles):
+                person = cells[(day - 1) * n_roles + index]
+                self.work_days[person] += 1
+                self.week_days[week][person] += 1
+                self.day_persons[day][person] += 1
+            for name, (_, penalty_function) in schedule.custom_penalties.items():
+                self.custom_state[day][name] = bool(penalty_function(schedule, day, self.plan))
+
+        self._pending = None
+
+    def delta(self, day, role, person):
+        # Cambio de costo si plan[day][role] pasa a ser person; no modifica el plan
+        schedule = self.schedule
+        cell = (day - 1) * len(self.roles) + self.role_index[role]
+        old = self.plan.cells[cell]
+        changes = {}
+        if old == person:
+            self._pending = (day, role, person, 0, changes, None)
+            return 0
+
+        cost = 0
+
+        # Exceso de días en el mes: cada día por encima del máximo cuesta 2
+        month = 0
+        if self.work_days[old] > schedule.max_month_days:
+            month -= 1
+        if self.work_days[person] >= schedule.max_month_days:
+            month += 1
+        if month:
+            changes[PENALTY_MONTH] = month
+            cost += month * 2
+
+        # Exceso de días en la semana: 5 por persona y semana excedida
+        week_days = self.week_days[schedule.week_of_day[day - 1]]
+        week = 0
+        if week_days[old] == schedule.max_week_days + 1:
+            week -= 1
+        if week_days[person] == schedule.max_week_days:
+            week += 1
+        if week:
+            changes[PENALTY_WEEK] = week
+            cost += week * 5
+
+        # Doble rol en el mismo día
+        day_persons = self.day_persons[day]
+        double = 0
+        if day_persons[old] >= 2:
+            double -= 1
+        if day_persons[person] >= 1:
+            double += 1
+        if double:
+            changes[PENALTY_DOUBLE] = double
+            cost += double * 15
+
+        # Descanso insuficiente: solo cambian los pares de asignaciones consecutivas que tocan este slot
+        if schedule.check_rest:
+            slot = (day, role)
+            violation = schedule.rest_violation
+            prev_old, next_old = schedule.rest_neighbors(self.plan.cells, old, day, role)
+            prev_new, next_new = schedule.rest_neighbors(self.plan.cells, person, day, role)
+            rest = (violation(prev_old, next_old) - violation(prev_old, slot) - violation(slot, next_old)
+                    + violation(prev_new, slot) + violation(slot, next_new) - violation(prev_new, next_new))
+            if rest:
+                changes[PENALTY_REST] = rest
+                cost += rest * 10
+
+        # Penalizaciones personalizadas: se reevalúa solo el día modificado
+        custom = None
+        if schedule.custom_penalties:
+            custom = {}
+            self.plan.cells[cell] = person
+            for name, (penalty_cost, penalty_function) in schedule.custom_penalties.items():
+                custom[name] = bool(penalty_function(schedule, day, self.plan))
+                diff = custom[name] - self.custom_state[day][name]
+                if diff:
+                    changes[name] = diff
+                    cost += diff * penalty_cost
+            self.plan.cells[cell] = old
+
+        # Reglas declarativas: solo se revisan las celdas relacionadas con este slot
+        index = self.role_index[role]
+        for rule, worked in zip(schedule.rules, self.rule_worked):
+            diff = rule_delta(schedule, rule, self.plan.cells, day, index, old, person, worked)
+            if diff:
+                changes[rule['name']] = diff
+                cost += diff * rule['cost']
+
+        self._pending = (day, role, person, cost, changes, custom)
+        return cost
+
+    def apply(self, day, role, person):
+        # Aplica la reasignación en el plan y actualiza los contadores
+        if self._pending is None or self._pending[:3] != (day, role, person):
+            self.delta(day, role, person)
+        _, _, _, cost, changes, custom = self._pending
+        self._pending = None
+
+        cell = (day - 1) * len(self.roles) + self.role_index[role]
+        old = self.plan.cells[cell]
+        if old == person:
+            return
+
+        week_days = self.week_days[self.schedule.week_of_day[day - 1]]
+        self.work_days[old] -= 1
+        self.work_days[person] += 1
+        week_days[old] -= 1
+        week_days[person] += 1
+        self.day_persons[day][old] -= 1
+        self.day_persons[day][person] += 1
+        if custom is not None:
+            self.custom_state[day] = custom
+        index = self.role_index[role]
+        for rule, worked in zip(self.schedule.rules, self.rule_worked):
+            if worked is not None and rule['roles'][index]:
+                worked[old] -= 1
+                worked[person] += 1
+
+        self.plan.cells[cell] = person
+        self.cost += cost
+        for name, value in changes.items():
+            self.penalties[name] += value
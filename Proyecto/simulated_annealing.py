@@ -1,55 +1,166 @@
 import math
 import random
+import time
+from array import array
 
 # Parámetros del recocido simulado
 INIT_TEMP = 10000
 COOLING = 0.9999
 MIN_TEMP = 1
+# Calibración de la temperatura inicial: movimientos de muestra y probabilidad de aceptar uno que empeora
+CALIBRATION_SAMPLES = 200
+CALIBRATION_ACCEPTANCE = 0.8
+# Cada cuántos pasos se revisa el reloj y se guarda un punto de la traza de convergencia
+CHECK_EVERY = 256
+TRACE_EVERY = 1000
+# Máximo de recalentamientos por corrida, para que la cadena siempre termine de enfriarse
+MAX_REHEATS = 5
 
 
 # Inicializar un horario aleatorio
-def init_plan(schedule):
-    plan = {
-        day: {role: random.randint(0, schedule.persons - 1) for role in schedule.roles}
-        for day in range(1, schedule.n_days + 1)
-    }
+def init_plan(schedule, rng=random):
+    plan = schedule.empty_plan()
+    plan.cells = array('h', (rng.randint(0, schedule.persons - 1)
+                             for _ in range(schedule.n_days) for _ in schedule.roles))
     return plan
 
 
 # Generar un neighbor del horario actual
-def generate_neighbor(schedule, plan):
-    new_plan = {day: roles_day.copy() for day, roles_day in plan.items()}
-    day = random.randint(1, schedule.n_days)
-    role = random.choice(list(schedule.roles.keys()))
-    person = random.randint(0, schedule.persons - 1)
+def generate_neighbor(schedule, plan, rng=random):
+    new_plan = schedule.as_plan(plan).copy()
+    day, role, person = random_move(schedule, list(schedule.roles.keys()), rng)
     new_plan[day][role] = person
     return new_plan
 
 
-# Algoritmo de recocido simulado
-def simulated_annealing(schedule):
-    actual_plan = init_plan(schedule)
-    actual_cost, _ = schedule.calculate_cost(actual_plan)
-    temp = INIT_TEMP
+# Elegir una reasignación aleatoria (día, rol, persona)
+def random_move(schedule, roles, rng=random):
+    day = rng.randint(1, schedule.n_days)
+    role = rng.choice(roles)
+    person = rng.randint(0, schedule.persons - 1)
+    return day, role, person
+
+
+# Calibrar la temperatura inicial: con muestras de movimientos aleatorios sobre el plan del evaluador,
+# la temperatura a la que un movimiento que empeora el costo en promedio se acepta con probabilidad acceptance
+def calibrate_temp(evaluator, rng=random, samples=CALIBRATION_SAMPLES, acceptance=CALIBRATION_ACCEPTANCE):
+    schedule = evaluator.schedule
+    roles = list(schedule.roles.keys())
+    worse = [delta for delta in (evaluator.delta(*random_move(schedule, roles, rng)) for _ in range(samples))
+             if delta > 0]
+    if not worse:
+        return MIN_TEMP * 2
+    return max(MIN_TEMP * 2, -(sum(worse) / len(worse)) / math.log(acceptance))
+
+
+# Factor de enfriamiento para bajar de temp a min_temp en exactamente steps pasos
+def cooling_for_steps(temp, steps, min_temp=MIN_TEMP):
+    if steps <= 0:
+        raise ValueError("El número de pasos debe ser positivo")
+    return (min_temp / temp) ** (1 / steps)
+
+
+# Enfriar la cadena del evaluador desde temp hasta min_temp, o solo max_steps pasos para poder
+# continuarla después; el plan del evaluador se modifica en su lugar. Opcionalmente:
+#   patience     se detiene tras ese número de pasos sin mejorar el mejor costo
+#   reheat_after tras ese número de pasos sin mejorar, regresa al doble de la temperatura en que se
+#                encontró el mejor plan (sin pasar de la inicial), hasta max_reheats veces
+#   lower_bound  se detiene al llegar a esa cota (p. ej. la del branch and bound), no se puede mejorar
+#   time_limit   segundos de reloj como máximo
+# El resultado incluye por qué se detuvo y la traza de convergencia: un punto en cada mejora y cada
+# trace_every pasos.
+def anneal(evaluator, temp, rng=random, max_steps=None, cooling=COOLING, min_temp=MIN_TEMP, patience=None,
+           reheat_after=None, max_reheats=MAX_REHEATS, lower_bound=None, time_limit=None,
+           trace_every=TRACE_EVERY):
+    start = time.perf_counter()
+    deadline = None if time_limit is None else start + time_limit
+    schedule = evaluator.schedule
+    actual_plan = evaluator.plan
+    roles = list(schedule.roles.keys())
 
-    best_plan = actual_plan
-    best_cost = actual_cost
-    best_penalties = None
+    best_plan = actual_plan.copy()
+    best_cost = evaluator.cost
+    best_penalties = dict(evaluator.penalties)
+    initial_temp = best_temp = temp
+    steps = 0
+    accepted = 0
+    reheats = 0
+    last_improvement = 0
+    trace = [{'step': 0, 'time': 0.0, 'temp': temp, 'cost': evaluator.cost, 'best': best_cost}]
 
-    while temp > MIN_TEMP:
-        neighbor = generate_neighbor(schedule, actual_plan)
-        neighbor_cost, neighbor_penalties = schedule.calculate_cost(neighbor)
+    def point():
+        trace.append({'step': steps, 'time': time.perf_counter() - start, 'temp': temp, 'cost': evaluator.cost,
+                      'best': best_cost})
 
-        delta = neighbor_cost - actual_cost
-        if delta < 0 or random.uniform(0, 1) < math.exp(-delta / temp):
-            actual_plan = neighbor
-            actual_cost = neighbor_cost
+    stop = 'min_temp'
+    while temp > min_temp:
+        if max_steps is not None and steps >= max_steps:
+            stop = 'max_steps'
+            break
+        if lower_bound is not None and best_cost <= lower_bound:
+            stop = 'lower_bound'
+            break
+        if patience is not None and steps - last_improvement >= patience:
+            stop = 'patience'
+            break
+        if deadline is not None and steps % CHECK_EVERY == 0 and time.perf_counter() >= deadline:
+            stop = 'time_limit'
+            break
 
-        if actual_cost < best_cost:
-            best_plan = actual_plan
-            best_cost = actual_cost
-            best_penalties = neighbor_penalties
+        day, role, person = random_move(schedule, roles, rng)
+        delta = evaluator.delta(day, role, person)
+
+        if delta < 0 or rng.uniform(0, 1) < math.exp(-delta / temp):
+            evaluator.apply(day, role, person)
+            accepted += 1
+
+            if evaluator.cost < best_cost:
+                best_plan = actual_plan.copy()
+                best_cost = evaluator.cost
+                best_penalties = dict(evaluator.penalties)
+                best_temp = temp
+                last_improvement = steps + 1
+                point()
+
+        temp *= cooling
+        steps += 1
+
+        stalled = steps - last_improvement
+        if reheat_after and reheats < max_reheats and stalled and stalled % reheat_after == 0:
+            temp = max(temp, min(initial_temp, 2 * best_temp))
+            reheats += 1
+        if trace_every and steps % trace_every == 0:
+            point()
+
+    if trace[-1]['step'] != steps:
+        point()
+    return {
+        'temp': temp,
+        'best_plan': best_plan,
+        'best_cost': best_cost,
+        'best_penalties': best_penalties,
+        'steps': steps,
+        'accepted': accepted,
+        'reheats': reheats,
+        'stop': stop,
+        'trace': trace,
+        'time': time.perf_counter() - start,
+    }
 
-        temp *= COOLING
 
-    return best_plan, best_cost, best_penalties
+# Algoritmo de recocido simulado. init_temp puede ser 'auto' para calibrarla con calibrate_temp, y con
+# steps el enfriamiento se ajusta para terminar en ese número de pasos; las demás opciones son las de
+# anneal. Regresa el mejor plan, su costo, sus penalizaciones y la traza de convergencia.
+def simulated_annealing(schedule, rng=random, init_temp=INIT_TEMP, cooling=COOLING, min_temp=MIN_TEMP,
+                        steps=None, patience=None, reheat_after=None, max_reheats=MAX_REHEATS, lower_bound=None,
+                        time_limit=None):
+    # El plan actual se modifica en su lugar; el evaluador da el costo de cada movimiento
+    evaluator = schedule.evaluator(init_plan(schedule, rng))
+    if init_temp == 'auto':
+        init_temp = calibrate_temp(evaluator, rng)
+    if steps is not None:
+        cooling = cooling_for_steps(init_temp, steps, min_temp)
+    result = anneal(evaluator, init_temp, rng, cooling=cooling, min_temp=min_temp, patience=patience,
+                    reheat_after=reheat_after, max_reheats=max_reheats, lower_bound=lower_bound,
+                    time_limit=time_limit)
+    return result['best_plan'], result['best_cost'], result['best_penalties'], result['trace']
@@ -0,0 +1,27 @@
+import json
+import os
+
+from main import build_schedule
+from parallel_annealing import LADDER_FLOOR, ladder_temp, parallel_annealing
+from simulated_annealing import INIT_TEMP, MIN_TEMP
+
+CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'granja_config.json')
+
+
+def test_ladder_stays_above_min_temp():
+    for chains in (1, 2, 15, 32, 64):
+        temps = [ladder_temp(i, chains) for i in range(chains)]
+        assert temps[0] == INIT_TEMP
+        assert all(temp > MIN_TEMP for temp in temps)
+        assert all(hot > cold for hot, cold in zip(temps, temps[1:]))
+    assert abs(ladder_temp(31, 32) - LADDER_FLOOR) < 1e-9
+
+
+def test_every_chain_steps_with_exchange():
+    with open(CONFIG, 'r') as file:
+        schedule = build_schedule(json.load(file))
+    plan, cost, penalties, stats = parallel_annealing(schedule, chains=32, seed=1, exchange_every=50, workers=2,
+                                                      time_limit=3)
+    assert len(stats) == 32
+    assert all(chain['steps'] > 0 for chain in stats)
+    assert cost == min(chain['best_cost'] for chain in stats)
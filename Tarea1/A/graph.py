@@ -0,0 +1,145 @@
+from array import array
+from collections import Counter
+from itertools import accumulate, chain, repeat
+
+# Formatos de lista de aristas:
+#   edges    una arista por línea "origen destino costo"; separada por tabuladores o comas si la línea
+#            los tiene (así los nombres pueden llevar espacios) y si no por espacios. Las líneas vacías
+#            y las que empiezan con # se ignoran.
+#   dimacs   formato .gr del 9th DIMACS Implementation Challenge (redes de carreteras): líneas "a u v w"
+#            con nodos numerados desde 1; las líneas "c" y "p" se ignoran. Los nombres son los números.
+EDGES = 'edges'
+DIMACS = 'dimacs'
+
+
+# Grafo con los nombres de los nodos internados a enteros 0..n-1 y las aristas en formato CSR: las aristas
+# que salen del nodo u son targets[offsets[u]:offsets[u + 1]] con sus costos en weights. Los arreglos son
+# array de la biblioteca estándar, así que un grafo de millones de aristas ocupa unos bytes por arista en
+# lugar de un dict por nodo.
+class Graph:
+    def __init__(self, names, offsets, targets, weights):
+        self.names = names
+        self.index = {name: node for node, name in enumerate(names)}
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+
+    def __len__(self):
+        return len(self.names)
+
+    def edge_count(self):
+        return len(self.targets)
+
+    def node(self, name):
+        if name not in self.index:
+            raise ValueError(f"El nodo {name!r} no está en el grafo")
+        return self.index[name]
+
+    def neighbors(self, node):
+        for edge in range(self.offsets[node], self.offsets[node + 1]):
+            yield self.targets[edge], self.weights[edge]
+
+    # Grafo con las aristas al revés (para buscar hacia atrás desde la meta)
+    def reverse(self):
+        offsets = self.offsets
+        sources = array('l', chain.from_iterable(repeat(node, offsets[node + 1] - offsets[node])
+                                                 for node in range(len(self))))
+        return build_csr(self.names, self.targets, sources, self.weights)
+
+    # Grafo a partir de tuplas (origen, destino, costo) con nombres cualesquiera
+    @classmethod
+    def from_edges(cls, edges, directed=True):
+        columns = list(zip(*edges)) or [(), (), ()]
+        return cls.from_columns(*columns, directed=directed)
+
+    # Grafo a partir de tres columnas: nombres de origen, nombres de destino y costos. Los nombres se
+    # numeran en el orden en que aparecen (primero los orígenes); todo el trabajo por arista lo hacen map,
+    # dict y sorted en C, que con millones de aristas es varias veces más rápido que un ciclo en Python.
+    @classmethod
+    def from_columns(cls, source_names, target_names, weights, directed=True):
+        weights = array('d', weights)
+        if weights and min(weights) < 0:
+            raise ValueError("Los costos de las aristas no pueden ser negativos")
+        names = list(dict.fromkeys(chain(source_names, target_names)))
+        index = {name: node for node, name in enumerate(names)}
+        sources = array('l', map(index.__getitem__, source_names))
+        targets = array('l', map(index.__getitem__, target_names))
+        if not directed:
+            sources, targets = sources + targets, targets + sources
+            weights = weights + weights
+        return build_csr(names, sources, targets, weights)
+
+    # Formato de problem['transitions']: {origen: {destino: costo}}. Los destinos que no aparecen como
+    # origen también son nodos, sin aristas de salida.
+    @classmethod
+    def from_transitions(cls, transitions):
+        return cls.from_edges((source, target, weight)
+                              for source, children in transitions.items()
+                              for target, weight in children.items())
+
+
+# Ordenar las aristas por origen (sorted es estable, así que cada nodo conserva el orden de sus aristas)
+# y armar los offsets con el número de aristas de cada nodo
+def build_csr(names, sources, targets, weights):
+    order = sorted(range(len(sources)), key=sources.__getitem__)
+    counts = Counter(sources)
+    offsets = array('l', accumulate((counts[node] for node in range(len(names))), initial=0))
+    return Graph(names, offsets, array('l', map(targets.__getitem__, order)),
+                 array('d', map(weights.__getitem__, order)))
+
+
+# Los parsers regresan las tres columnas de from_columns
+def parse_edges(file):
+    edges = []
+    for line in file:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        separator = '\t' if '\t' in line else ',' if ',' in line else None
+        source, target, weight = (token.strip() for token in line.split(separator))
+        edges.append((source, target, float(weight)))
+    return list(zip(*edges)) or [(), (), ()]
+
+
+def parse_dimacs(file):
+    # Todas las líneas de aristas tienen cuatro campos; se parten de una vez y se toman por columnas
+    tokens = ' '.join(line for line in file if line.startswith('a')).split()
+    return list(map(int, tokens[1::4])), list(map(int, tokens[2::4])), list(map(float, tokens[3::4]))
+
+
+# Leer un grafo de un archivo de aristas; con directed=False cada arista se agrega en los dos sentidos
+def load_graph(path, file_format=None, directed=True):
+    if file_format is None:
+        file_format = DIMACS if path.endswith('.gr') else EDGES
+    parsers = {EDGES: parse_edges, DIMACS: parse_dimacs}
+    if file_format not in parsers:
+        raise ValueError(f"Formato desconocido {file_format!r}")
+    with open(path, 'r') as file:
+        return Graph.from_columns(*parsers[file_format](file), directed=directed)
+
+
+# Arreglos de costo y padre de una búsqueda, preasignados una vez por grafo y reutilizados entre consultas.
+# En lugar de limpiarlos en cada consulta, cada una tiene un número y reached[u] (closed[u]) guarda el de
+# la última consulta que alcanzó (cerró) u, así que empezar una consulta nueva es O(1).
+class SearchSpace:
+    def __init__(self, graph):
+        n = len(graph)
+        self.cost = array('d', [0.0]) * n
+        self.parent = array('l', [0]) * n
+        self.reached = array('l', [0]) * n
+        self.closed = array('l', [0]) * n
+        self.query = 0
+        # Nodos expandidos y tamaño máximo de la cola en la última consulta
+        self.expanded = 0
+        self.max_fringe = 0
+
+    def reset(self):
+        self.query += 1
+        return self.query
+
+    def path(self, graph, node):
+        path = []
+        while node >= 0:
+            path.append(graph.names[node])
+            node = self.parent[node]
+        return path[::-1]
@@ -0,0 +1,154 @@
+import heapq
+import json
+import math
+import random
+from array import array
+
+INFINITY = math.inf
+# Landmarks por defecto; con más la heurística es más ajustada pero cada evaluación cuesta más
+LANDMARKS = 8
+
+
+# Distancias más cortas desde source a todos los nodos (infinito si no se alcanza)
+def dijkstra(graph, source):
+    distance = array('d', [INFINITY]) * len(graph)
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    distance[source] = 0
+    fringe = [(0, source)]
+    while fringe:
+        node_distance, node = heapq.heappop(fringe)
+        if node_distance > distance[node]:
+            continue
+        for edge in range(offsets[node], offsets[node + 1]):
+            child = targets[edge]
+            new_distance = node_distance + weights[edge]
+            if new_distance < distance[child]:
+                distance[child] = new_distance
+                heapq.heappush(fringe, (new_distance, child))
+    return distance
+
+
+# Heurística ALT (A*, landmarks y desigualdad del triángulo). Para cada landmark L se tienen las distancias
+# desde L (forward) y hacia L (backward, calculadas en el grafo al revés). Por el triángulo,
+#   d(v, t) >= d(L, t) - d(L, v)   y   d(v, t) >= d(v, L) - d(t, L)
+# y la heurística es el máximo de esas cotas, que es admisible y consistente para cualquier par de nodos.
+class Landmarks:
+    def __init__(self, nodes, forward, backward):
+        self.nodes = nodes
+        self.forward = forward
+        self.backward = backward
+
+    # Cota inferior de d(source, target) con los números de nodo
+    def lower_bound(self, source, target):
+        return self.to(target)[source]
+
+    # Heurística hacia target, indexable por número de nodo como la que recibe graph_search
+    def to(self, target):
+        return LandmarkHeuristic(self, target)
+
+    # Heurística desde source: cota inferior de d(source, v)
+    def from_(self, source):
+        return LandmarkHeuristic(self, source, reverse=True)
+
+    # Archivo binario: una línea JSON con el número de nodos y aristas del grafo y los landmarks, y luego las
+    # tablas como doubles (todas las forward y luego todas las backward)
+    def save(self, path, graph):
+        header = {'nodos': len(graph), 'aristas': graph.edge_count(), 'landmarks': list(self.nodes)}
+        with open(path, 'wb') as file:
+            file.write(json.dumps(header).encode() + b'\n')
+            for table in self.forward + self.backward:
+                table.tofile(file)
+
+    @classmethod
+    def load(cls, path, graph):
+        with open(path, 'rb') as file:
+            header = json.loads(file.readline())
+            if header['nodos'] != len(graph) or header['aristas'] != graph.edge_count():
+                raise ValueError(f"{path} se calculó para otro grafo")
+            tables = []
+            for _ in range(2 * len(header['landmarks'])):
+                table = array('d')
+                table.fromfile(file, len(graph))
+                tables.append(table)
+        count = len(header['landmarks'])
+        return cls(header['landmarks'], tables[:count], tables[count:])
+
+
+class LandmarkHeuristic:
+    def __init__(self, landmarks, node, reverse=False):
+        self.n = len(landmarks.forward[0]) if landmarks.forward else 0
+        # Por landmark, las dos tablas y las distancias de node que no cambian en toda la consulta
+        if reverse:
+            # Cota de d(node, v): la misma fórmula con los papeles de forward y backward cambiados
+            self.tables = [(backward, backward[node], forward, forward[node])
+                           for forward, backward in zip(landmarks.forward, landmarks.backward)]
+        else:
+            self.tables = [(forward, forward[node], backward, backward[node])
+                           for forward, backward in zip(landmarks.forward, landmarks.backward)]
+
+    def __len__(self):
+        return self.n
+
+    # Si una distancia a landmark es infinita y la otra no, target no se alcanza desde node y la cota es
+    # infinita
+    def __getitem__(self, node):
+        best = 0
+        for first, first_target, second, second_target in self.tables:
+            if first_target != INFINITY:
+                best = max(best, first_target - first[node])
+            elif first[node] != INFINITY:
+                return INFINITY
+            if second[node] != INFINITY:
+                best = max(best, second[node] - second_target)
+            elif second_target != INFINITY:
+                return INFINITY
+        return best
+
+
+# Elegir landmarks lejanos (farthest): el primero es el nodo más lejano a uno al azar y cada siguiente el
+# que maximiza la distancia (ida más vuelta) al landmark más cercano ya elegido. Los landmarks en la
+# orilla del grafo dan cotas más ajustadas que los del centro.
+def select_landmarks(graph, count=LANDMARKS, seed=0, reverse=None):
+    if len(graph) == 0:
+        raise ValueError("El grafo no tiene nodos")
+    count = min(count, len(graph))
+    reverse = reverse or graph.reverse()
+    start = random.Random(seed).randrange(len(graph))
+    distance = dijkstra(graph, start)
+    closest = array('d', (value if value != INFINITY else -1 for value in distance))
+    nodes, forward, backward = [], [], []
+    for _ in range(count):
+        landmark = max(range(len(graph)), key=closest.__getitem__)
+        if closest[landmark] <= 0 and nodes:
+            # Los nodos que faltan ya son landmarks o no se alcanzan
+            break
+        nodes.append(landmark)
+        forward.append(dijkstra(graph, landmark))
+        backward.append(dijkstra(reverse, landmark))
+        for node in range(len(graph)):
+            total = forward[-1][node] + backward[-1][node]
+            if total < closest[node] or (closest[node] < 0 and total != INFINITY):
+                closest[node] = total
+    return Landmarks(nodes, forward, backward)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    from graph import load_graph
+
+    parser = argparse.ArgumentParser(description="Precalcular las tablas de landmarks (ALT) de un grafo")
+    parser.add_argument('grafo', help="lista de aristas o archivo .gr de DIMACS")
+    parser.add_argument('-k', '--landmarks', type=int, default=LANDMARKS, help="número de landmarks")
+    parser.add_argument('-o', '--salida', help="archivo de tablas (por defecto grafo.landmarks)")
+    parser.add_argument('--no-dirigido', action='store_true', help="agregar cada arista en los dos sentidos")
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    graph = load_graph(args.grafo, directed=not args.no_dirigido)
+    landmarks = select_landmarks(graph, args.landmarks, args.semilla)
+    landmarks.save(args.salida or f"{args.grafo}.landmarks", graph)
+    print(f"{len(landmarks.nodes)} landmarks para {len(graph)} nodos y {graph.edge_count()} aristas "
+          f"en {time.perf_counter() - start:.1f}s")
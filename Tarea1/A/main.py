@@ -1,74 +1,181 @@
-import heapq
+import os
+import sys
+from array import array
 
+from graph import Graph, SearchSpace
+from landmarks import INFINITY, Landmarks, select_landmarks
 
-def graph_search(problem, heuristic):
-    fringe = []  # Cola de prioridad
-    closed = set()  # Set para estados explorados
-    parent = {}  # Dictionario para guardar el padre de cada nodo
-    heuristic_cost = {}  # Diccionario para llevar el costo de la heuristica
+# La cola de prioridad está en Tarea1/, compartida con la mochila
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from priority_queue import IndexedHeap  # noqa: E402
 
-    # Empezamos con el estado inicial
-    start_node = make_node(problem['initial_state'])
-    start_state = state(start_node)
 
-    # Inicializamos la cola de prioridad con el nodo inicial
-    initial_priority = 0 if heuristic is None or not heuristic else heuristic[start_state]
-    heapq.heappush(fringe, (initial_priority, start_node))  # (prioridad, nodo)
-    parent[start_state] = None  # El estado inicial no tiene padre
-    heuristic_cost[start_state] = 0  # el costo del estado inicial es 0
+# A* sobre el grafo del problema: problem['graph'] (un Graph) o, en el formato original, problem['transitions']
+# como dict de dicts, que se convierte a Graph en cada llamada. Para muchas consultas sobre el mismo grafo
+# conviene guardar el Graph en problem['graph'] y pasar un SearchSpace para reutilizar sus arreglos.
+# heuristic puede ser un dict por nombre de nodo (los que falten valen 0), una secuencia por número de nodo
+# o unos Landmarks, que dan la heurística ALT hacia cualquier meta; con None o {} la búsqueda es de costo
+# uniforme. El número de nodos expandidos queda en space.expanded y el tamaño máximo de la cola en
+# space.max_fringe.
+def graph_search(problem, heuristic, space=None):
+    graph = problem_graph(problem)
+    if initial_state(problem) not in graph.index:
+        # Un estado sin aristas no aparece en el grafo
+        return [initial_state(problem)] if goal_test(problem, initial_state(problem)) else None
+    start = graph.node(initial_state(problem))
+    goal = graph.index.get(problem['goal_state'], -1)
+    h = heuristic_values(graph, heuristic, goal)
 
-    while fringe:
-        _, node = heapq.heappop(fringe)
-        current_state = state(node)
+    if space is None:
+        space = SearchSpace(graph)
+    query = space.reset()
+    cost, parent, reached, closed = space.cost, space.parent, space.reached, space.closed
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+
+    # Cola de prioridad con una entrada por nodo; los empates de f los gana el de menor heurística
+    fringe = IndexedHeap()
+    fringe.push(start, h[start] if h is not None else 0, h[start] if h is not None else 0)
+    cost[start] = 0  # el costo del estado inicial es 0
+    parent[start] = -1  # El estado inicial no tiene padre
+    reached[start] = query
+    space.expanded = 0
 
-        if goal_test(problem, current_state):
-            return reconstruct_path(parent, current_state)
+    while fringe:
+        node, _ = fringe.pop()
 
-        if current_state not in closed:
-            closed.add(current_state)
+        if node == goal:
+            space.max_fringe = fringe.max_size
+            return space.path(graph, node)
 
-            for child_node, transition_cost in expand(current_state, problem):
-                child_state = state(child_node)
-                new_cost = heuristic_cost[current_state] + transition_cost
+        closed[node] = query
+        space.expanded += 1
 
-                if child_state not in closed and (
-                        child_state not in heuristic_cost or new_cost < heuristic_cost[child_state]):
-                    heuristic_cost[child_state] = new_cost
-                    priority = new_cost if heuristic is None or not heuristic else new_cost + heuristic[child_state]
-                    heapq.heappush(fringe, (priority, child_node))
-                    parent[child_state] = current_state
+        node_cost = cost[node]
+        for edge in range(offsets[node], offsets[node + 1]):
+            child = targets[edge]
+            if closed[child] == query:
+                continue
+            new_cost = node_cost + weights[edge]
+            if reached[child] != query or new_cost < cost[child]:
+                child_h = h[child] if h is not None else 0
+                if child_h == INFINITY:
+                    # La meta no se alcanza desde child
+                    continue
+                reached[child] = query
+                cost[child] = new_cost
+                parent[child] = node
+                # Si child ya estaba en la cola, baja su prioridad
+                fringe.push(child, new_cost + child_h, child_h)
 
+    space.max_fringe = fringe.max_size
     return None  # No solution found
 
 
-def make_node(state):
-    return {'state': state}
+# A* bidireccional con landmarks: una búsqueda desde el inicio en el grafo y otra desde la meta en el grafo
+# al revés. Para que las dos usen costos reducidos consistentes se usa el potencial promedio
+#   p(v) = (h_meta(v) - h_inicio(v)) / 2
+# con prioridad g + p(v) hacia adelante y g - p(v) hacia atrás; así una ruta por v cuesta la suma de las
+# dos prioridades y se puede parar cuando la suma de los dos mínimos de las colas llega al mejor costo
+# encontrado. Sin landmarks es Dijkstra bidireccional. Cada paso expande el lado con la menor prioridad.
+# reverse es graph.reverse() (conviene calcularlo una vez para muchas consultas) y spaces dos SearchSpace.
+def bidirectional_search(problem, landmarks=None, reverse=None, spaces=None):
+    graph = problem_graph(problem)
+    if initial_state(problem) not in graph.index or problem['goal_state'] not in graph.index:
+        return [initial_state(problem)] if goal_test(problem, initial_state(problem)) else None
+    start = graph.node(initial_state(problem))
+    goal = graph.node(problem['goal_state'])
+    reverse = reverse or graph.reverse()
+    spaces = spaces or (SearchSpace(graph), SearchSpace(graph))
 
+    to_goal = landmarks.to(goal) if landmarks else None
+    from_start = landmarks.from_(start) if landmarks else None
+    potentials = {}
 
-def state(node):
-    return node['state']
+    # None para los nodos que no pueden estar en una ruta del inicio a la meta
+    def potential(node):
+        if to_goal is None:
+            return 0
+        if node not in potentials:
+            ahead, behind = to_goal[node], from_start[node]
+            potentials[node] = None if ahead == INFINITY or behind == INFINITY else (ahead - behind) / 2
+        return potentials[node]
 
+    if start == goal:
+        return [graph.names[start]]
+    if potential(start) is None or potential(goal) is None:
+        return None
+    sides = []
+    for space, sign, origin in ((spaces[0], 1, start), (spaces[1], -1, goal)):
+        query = space.reset()
+        space.cost[origin] = 0
+        space.parent[origin] = -1
+        space.reached[origin] = query
+        space.expanded = 0
+        fringe = IndexedHeap()
+        fringe.push(origin, sign * potential(origin), sign * potential(origin))
+        sides.append((space, sign, query, fringe))
+    graphs = (graph, reverse)
 
-def initial_state(problem):
-    return problem['initial_state']
+    best, meeting = INFINITY, -1
+    while sides[0][3] and sides[1][3] and sides[0][3].peek()[0] + sides[1][3].peek()[0] < best:
+        side = 0 if sides[0][3].peek()[0] <= sides[1][3].peek()[0] else 1
+        space, sign, query, fringe = sides[side]
+        other = sides[1 - side][0]
+        other_query = sides[1 - side][2]
+        node, _ = fringe.pop()
+        space.closed[node] = query
+        space.expanded += 1
 
+        node_cost = space.cost[node]
+        offsets, targets, weights = graphs[side].offsets, graphs[side].targets, graphs[side].weights
+        for edge in range(offsets[node], offsets[node + 1]):
+            child = targets[edge]
+            new_cost = node_cost + weights[edge]
+            if space.closed[child] == query or (space.reached[child] == query and new_cost >= space.cost[child]):
+                continue
+            child_potential = potential(child)
+            if child_potential is None:
+                continue
+            space.reached[child] = query
+            space.cost[child] = new_cost
+            space.parent[child] = node
+            fringe.push(child, new_cost + sign * child_potential, sign * child_potential)
+            if other.reached[child] == other_query and new_cost + other.cost[child] < best:
+                best, meeting = new_cost + other.cost[child], child
 
-def goal_test(problem, state):
-    return state == problem['goal_state']
+    for space, _, _, fringe in sides:
+        space.max_fringe = fringe.max_size
+    if meeting < 0:
+        return None
+    # El camino de regreso sigue los padres de la búsqueda hacia atrás, que apuntan hacia la meta
+    return spaces[0].path(graph, meeting) + spaces[1].path(graph, meeting)[-2::-1]
+
+
+def problem_graph(problem):
+    if 'graph' in problem:
+        return problem['graph']
+    return Graph.from_transitions(problem['transitions'])
 
 
-def expand(state, problem):
-    # Generar nodos hijos con sus respectivos costos de transición
-    return [(make_node(s), cost) for s, cost in problem['transitions'].get(state, {}).items()]
+# Heurística como arreglo indexado por número de nodo
+def heuristic_values(graph, heuristic, goal):
+    if isinstance(heuristic, Landmarks):
+        return heuristic.to(goal) if goal >= 0 else None
+    if heuristic is None or len(heuristic) == 0:
+        return None
+    if isinstance(heuristic, dict):
+        return array('d', (heuristic.get(name, 0) for name in graph.names))
+    if len(heuristic) != len(graph):
+        raise ValueError("La heurística necesita un valor por nodo")
+    return heuristic
 
 
-def reconstruct_path(parent, goal_state):
-    path = []
-    current_state = goal_state
-    while current_state is not None:
-        path.append(current_state)
-        current_state = parent.get(current_state)
-    return path[::-1]  # Invertir para obtener el camino desde el inicio hasta el final
+def initial_state(problem):
+    return problem['initial_state']
+
+
+def goal_test(problem, state):
+    return state == problem['goal_state']
 
 
 if __name__ == '__main__':
@@ -151,3 +258,15 @@ if __name__ == '__main__':
         print(f"Solución encontrada: {solution_path}")
     else:
         print("No se encontró solución")
+
+    # Con landmarks la misma preparación sirve para cualquier par de ciudades, no solo para llegar a Bucarest
+    graph = Graph.from_transitions(problem['transitions'])
+    reverse = graph.reverse()
+    landmarks = select_landmarks(graph, 4, reverse=reverse)
+    problem = {'graph': graph, 'initial_state': 'timisora', 'goal_state': 'eforie'}
+    solution_path = bidirectional_search(problem, landmarks, reverse)
+
+    if solution_path:
+        print(f"Solución encontrada: {solution_path}")
+    else:
+        print("No se encontró solución")
@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from branch_and_bound import branch_and_bound
+from exact import solve_exact
+from loader import load_instance
+from multidimensional import is_multidimensional, multidimensional_branch_and_bound
+
+# Segundos máximos por instancia
+TIME_LIMIT = 60
+BRANCH_AND_BOUND = 'bb'
+EXACT = 'exacto'
+
+
+# Instancias de un directorio: archivos .json con el problema como dict (values, weights y capacity, o
+# weights como lista de listas y capacity como lista para la mochila multidimensional) o archivos de texto
+# en los formatos de loader.py. Se ignoran los .npy del caché del loader y los archivos ocultos.
+def list_instances(directory):
+    return [os.path.join(directory, file_name) for file_name in sorted(os.listdir(directory))
+            if not file_name.startswith('.') and not file_name.endswith('.npy')
+            and os.path.isfile(os.path.join(directory, file_name))]
+
+
+# capacity solo se usa en las instancias que no traen la suya
+def read_problem(path, capacity=None):
+    if path.endswith('.json'):
+        with open(path, 'r') as file:
+            problem = json.load(file)
+        if capacity is not None:
+            problem.setdefault('capacity', capacity)
+        return problem
+    problem = load_instance(path, default_capacity=capacity)
+    # Los solvers recorren los artículos en Python, donde las listas de enteros son más rápidas
+    return dict(problem, values=problem['values'].tolist(), weights=problem['weights'].tolist())
+
+
+# Resolver una instancia en un proceso del pool. El límite de tiempo lo revisan el branch and bound y el
+# método exacto (solo una dimensión); si se acaba, optimo es False. Un archivo inválido da un resultado con
+# "error".
+def solve_instance(path, time_limit=TIME_LIMIT, method=BRANCH_AND_BOUND, capacity=None):
+    start = time.perf_counter()
+    name = os.path.basename(path)
+    try:
+        problem = read_problem(path, capacity)
+        if is_multidimensional(problem):
+            result = multidimensional_branch_and_bound(problem, time_limit=time_limit)
+        elif method == EXACT:
+            result = solve_exact(problem, time_limit=time_limit)
+        else:
+            result = branch_and_bound(problem, time_limit=time_limit)
+    except (OSError, ValueError, KeyError) as error:
+        return {'instancia': name, 'error': f"{type(error).__name__}: {error}",
+                'tiempo': time.perf_counter() - start}
+    return {
+        'instancia': name,
+        'articulos_total': len(problem['values']),
+        'dimensiones': len(problem['capacity']) if is_multidimensional(problem) else 1,
+        'valor': result['value'],
+        'optimo': result['optimal'],
+        'peso': result['weight'],
+        'articulos': result['items'],
+        'nodos': result.get('nodes'),
+        'tiempo': time.perf_counter() - start,
+    }
+
+
+# Resolver todas las instancias en paralelo; cada resultado se escribe como una línea JSON en cuanto termina
+def solve_batch(paths, output, workers=None, time_limit=TIME_LIMIT, method=BRANCH_AND_BOUND, capacity=None):
+    if method not in (BRANCH_AND_BOUND, EXACT):
+        raise ValueError(f"Método desconocido {method!r}")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(solve_instance, path, time_limit, method, capacity) for path in paths}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                output.write(json.dumps(future.result(), ensure_ascii=False) + '\n')
+                output.flush()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Resolver muchas instancias de la mochila en paralelo")
+    parser.add_argument('source', help="directorio con instancias (o un solo archivo)")
+    parser.add_argument('-o', '--output', help="archivo JSONL de salida (por defecto la salida estándar)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="procesos del pool")
+    parser.add_argument('-t', '--tiempo', type=float, default=TIME_LIMIT, help="segundos máximos por instancia")
+    parser.add_argument('-m', '--metodo', choices=[BRANCH_AND_BOUND, EXACT], default=BRANCH_AND_BOUND)
+    parser.add_argument('-c', '--capacidad', type=int, help="capacidad para archivos que no la traen")
+    args = parser.parse_args()
+
+    paths = list_instances(args.source) if os.path.isdir(args.source) else [args.source]
+    if args.output:
+        with open(args.output, 'w') as output:
+            solve_batch(paths, output, args.workers, args.tiempo, args.metodo, args.capacidad)
+    else:
+        solve_batch(paths, sys.stdout, args.workers, args.tiempo, args.metodo, args.capacidad)
@@ -0,0 +1,123 @@
+from bisect import bisect_right
+from itertools import accumulate
+
+
+# Cota fraccionaria (Dantzig) precalculada: da exactamente los mismos valores que mochila_heuristica y
+# mochila_heuristica_optimizada, pero sin ordenar los artículos restantes en cada llamada.
+#
+# Los artículos se ordenan una sola vez por valor/peso. Si el problema ya viene en ese orden, los
+# artículos restantes desde index son un tramo del orden y basta con los pesos y valores acumulados y una
+# búsqueda binaria. Si no, se guarda un árbol de segmentos persistente sobre las posiciones del orden, con
+# una versión por cada index que solo contiene los artículos index..n-1; bajar por el árbol es la misma
+# búsqueda binaria sobre los acumulados de esos artículos. En los dos casos cada consulta es O(log n).
+class FractionalBound:
+    def __init__(self, problem):
+        self.values = problem['values']
+        self.weights = problem['weights']
+        self.capacity = problem['capacity']
+        self.n = len(self.values)
+        # Mismo orden que el sort de las heurísticas (estable, con reverse=True)
+        self.order = sorted(range(self.n), key=lambda i: self.values[i] / self.weights[i], reverse=True)
+        self.in_order = self.order == list(range(self.n))
+
+        if self.in_order:
+            self.cum_weight = [0] + list(accumulate(self.weights))
+            self.cum_value = [0] + list(accumulate(self.values))
+        else:
+            self._build_tree()
+
+    def _build_tree(self):
+        self.size = 1
+        while self.size < self.n:
+            self.size *= 2
+        # El nodo 0 es el árbol vacío y es su propio hijo
+        self.left = [0]
+        self.right = [0]
+        self.tree_weight = [0]
+        self.tree_value = [0]
+        rank = [0] * self.n
+        for position, item in enumerate(self.order):
+            rank[item] = position
+
+        self.roots = [0] * (self.n + 1)
+        for index in range(self.n - 1, -1, -1):
+            self.roots[index] = self._insert(self.roots[index + 1], rank[index], self.weights[index],
+                                             self.values[index])
+
+    def _new_node(self, left, right, weight, value):
+        self.left.append(left)
+        self.right.append(right)
+        self.tree_weight.append(weight)
+        self.tree_value.append(value)
+        return len(self.left) - 1
+
+    # Nueva versión del árbol con el artículo en la posición dada; solo se copia el camino a la hoja
+    def _insert(self, root, position, weight, value):
+        path = []
+        node, low, high = root, 0, self.size
+        while high - low > 1:
+            middle = (low + high) // 2
+            go_left = position < middle
+            path.append((node, go_left))
+            if go_left:
+                node, high = self.left[node], middle
+            else:
+                node, low = self.right[node], middle
+
+        new = self._new_node(0, 0, weight, value)
+        for node, go_left in reversed(path):
+            if go_left:
+                new = self._new_node(new, self.right[node], self.tree_weight[node] + weight,
+                                     self.tree_value[node] + value)
+            else:
+                new = self._new_node(self.left[node], new, self.tree_weight[node] + weight,
+                                     self.tree_value[node] + value)
+        return new
+
+    # Artículos desde index que caben completos en capacity, en orden de valor/peso: regresa su valor,
+    # la capacidad que sobra y el primer artículo que ya no cabe (None si caben todos)
+    def fill(self, index, capacity):
+        if self.in_order:
+            base_weight = self.cum_weight[index]
+            last = bisect_right(self.cum_weight, base_weight + capacity, lo=index) - 1
+            taken = self.cum_value[last] - self.cum_value[index]
+            remaining = capacity - (self.cum_weight[last] - base_weight)
+            return taken, remaining, (last if last < self.n else None)
+
+        node = self.roots[index]
+        if self.tree_weight[node] <= capacity:
+            return self.tree_value[node], capacity - self.tree_weight[node], None
+        taken = 0
+        low, high = 0, self.size
+        while high - low > 1:
+            middle = (low + high) // 2
+            left = self.left[node]
+            if self.tree_weight[left] <= capacity:
+                capacity -= self.tree_weight[left]
+                taken += self.tree_value[left]
+                node, low = self.right[node], middle
+            else:
+                node, high = left, middle
+        return taken, capacity, self.order[low]
+
+    # Valor fraccionario máximo de los artículos desde index con la capacidad dada (mochila_heuristica)
+    def value(self, index, capacity):
+        if capacity <= 0 or index == self.n:
+            return 0
+        estimated_value, capacity, item = self.fill(index, capacity)
+        if item is not None:
+            estimated_value += self.values[item] * (capacity / self.weights[item])
+        return estimated_value
+
+    # Se usa como heurística de graph_search igual que mochila_heuristica_optimizada
+    def __call__(self, state, problem=None):
+        index, current_weight, current_value = state
+        remaining_capacity = self.capacity - current_weight
+        if remaining_capacity <= 0 or index == self.n:
+            return 0
+        taken, remaining_capacity, item = self.fill(index, remaining_capacity)
+        # Mismo orden de las sumas que la heurística original para obtener el mismo redondeo
+        estimated_value = current_value + taken
+        if item is not None:
+            estimated_value += self.values[item] * (remaining_capacity / self.weights[item])
+        return estimated_value - current_value
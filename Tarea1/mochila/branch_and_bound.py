@@ -0,0 +1,80 @@
+import time
+
+from bound import FractionalBound
+from exact import check_problem, greedy, ratio_order
+
+# Cada cuántos nodos se revisa el límite de tiempo
+CHECK_EVERY = 4096
+
+
+# Branch and bound en profundidad sobre los artículos en orden de valor/peso: en cada nodo primero se
+# intenta tomar el artículo y luego dejarlo, y se poda con la cota fraccionaria (Dantzig). La primera
+# solución conocida es la voraz. La pila y el camino actual son la única memoria, lineal en n.
+# Regresa el mejor valor y sus artículos; optimal indica si se terminó de explorar el árbol (si se acaba
+# time_limit o node_limit, el valor es solo el mejor encontrado). Con telemetry (un Telemetry) se reportan
+# los nodos y el tamaño de la pila; la cota reportada es la de la raíz.
+def branch_and_bound(problem, time_limit=None, node_limit=None, telemetry=None):
+    start = time.perf_counter()
+    check_problem(problem)
+    order = ratio_order(problem)
+    weights = [problem['weights'][item] for item in order]
+    values = [problem['values'][item] for item in order]
+    capacity = problem['capacity']
+    n = len(order)
+    # En orden de valor/peso la cota usa solo los acumulados y una búsqueda binaria
+    bound = FractionalBound({'values': values, 'weights': weights, 'capacity': capacity})
+
+    best_value, best_items = greedy(problem, order)
+    # taken[position] dice si el camino actual tomó el artículo en esa posición
+    taken = [False] * n
+    # Nodos como (posición, peso, valor, si se tomó el artículo anterior)
+    stack = [(0, 0, 0, False)]
+    nodes = 0
+    complete = True
+    if telemetry is not None:
+        fill_value, remaining, item = bound.fill(0, capacity)
+        root_bound = fill_value + (values[item] * remaining // weights[item] if item is not None else 0)
+
+    while stack:
+        position, weight, value, took = stack.pop()
+        if position:
+            taken[position - 1] = took
+        nodes += 1
+        if nodes % CHECK_EVERY == 0 and ((time_limit is not None and time.perf_counter() - start > time_limit)
+                                         or (node_limit is not None and nodes > node_limit)):
+            complete = False
+            break
+        if telemetry is not None and nodes % telemetry.every == 0:
+            # Cada nodo de la pila se insertó una vez; los sacados son los nodos contados
+            telemetry.sample(nodes, nodes + len(stack), len(stack), best_value, root_bound)
+
+        if value > best_value:
+            best_value = value
+            best_items = [order[k] for k in range(position) if taken[k]]
+        if position == n:
+            continue
+
+        # Cota entera: los artículos que caben completos más la parte entera de la fracción del siguiente
+        fill_value, remaining, item = bound.fill(position, capacity - weight)
+        if item is not None:
+            fill_value += values[item] * remaining // weights[item]
+        if value + fill_value <= best_value:
+            continue
+
+        stack.append((position + 1, weight, value, False))
+        if weight + weights[position] <= capacity:
+            stack.append((position + 1, weight + weights[position], value + values[position], True))
+
+    elapsed = time.perf_counter() - start
+    if telemetry is not None:
+        telemetry.finish(nodes, nodes + len(stack), len(stack), best_value, best_value if complete else root_bound)
+    best_items.sort()
+    return {
+        'value': best_value,
+        'items': best_items,
+        'weight': sum(problem['weights'][item] for item in best_items),
+        'optimal': complete,
+        'nodes': nodes,
+        'time': elapsed,
+        'nodes_per_second': nodes / elapsed if elapsed else None,
+    }
@@ -0,0 +1,233 @@
+import time
+
+import numpy as np
+
+from bound import FractionalBound
+
+# Máximo de celdas (artículos x capacidad) cuyas decisiones se guardan como bits en la DP densa; con más,
+# la DP se parte en dos mitades (Hirschberg) y la memoria queda proporcional a la capacidad
+KEEP_BITS_LIMIT = 2 ** 30
+# Capacidad a partir de la cual la DP densa ya no conviene y se usa la frontera de Pareto
+DENSE_CAPACITY_LIMIT = 10 ** 7
+# Cada cuántos estados de la mezcla de fronteras se revisa el límite de tiempo
+MERGE_CHECK_EVERY = 4096
+
+
+def expired(deadline):
+    return deadline is not None and time.perf_counter() > deadline
+
+
+def check_problem(problem):
+    if len(problem['values']) != len(problem['weights']):
+        raise ValueError("values y weights deben tener la misma longitud")
+    if problem['capacity'] < 0:
+        raise ValueError("La capacidad no puede ser negativa")
+    if any(weight <= 0 for weight in problem['weights']) or any(value < 0 for value in problem['values']):
+        raise ValueError("Los pesos deben ser positivos y los valores no negativos")
+
+
+# Artículos en orden de valor/peso (el mismo orden estable que las heurísticas)
+def ratio_order(problem):
+    values, weights = problem['values'], problem['weights']
+    return sorted(range(len(values)), key=lambda i: values[i] / weights[i], reverse=True)
+
+
+# El mismo problema con los artículos en orden de valor/peso
+def sort_by_ratio(problem):
+    order = ratio_order(problem)
+    return dict(problem, values=[problem['values'][item] for item in order],
+                weights=[problem['weights'][item] for item in order])
+
+
+# Solución inicial: en orden de valor/peso se toma todo lo que quepa
+def greedy(problem, order):
+    remaining = problem['capacity']
+    chosen = []
+    for item in order:
+        if problem['weights'][item] <= remaining:
+            remaining -= problem['weights'][item]
+            chosen.append(item)
+    return sum(problem['values'][item] for item in chosen), chosen
+
+
+# Reducción de Dembo y Hammer: con el artículo de quiebre b (el primero que no cabe completo en la
+# solución fraccionaria) y su razón r = v_b / w_b, si un artículo se fija al revés de la solución
+# fraccionaria la cota baja a U - |v_j - r w_j|. Si esa cota no pasa de incumbent, ninguna solución mejor
+# que incumbent lo tiene al revés y se puede fijar. Regresa los artículos fijos dentro, los fijos fuera y
+# los que quedan (el núcleo), todos en orden de valor/peso.
+def reduce_items(problem, order, incumbent):
+    values, weights = problem['values'], problem['weights']
+    remaining = problem['capacity']
+    prefix_value = 0
+    break_position = len(order)
+    for position, item in enumerate(order):
+        if weights[item] > remaining:
+            break_position = position
+            break
+        remaining -= weights[item]
+        prefix_value += values[item]
+    if break_position == len(order):
+        # Caben todos
+        return list(order), [], []
+
+    break_item = order[break_position]
+    v_b, w_b = values[break_item], weights[break_item]
+    # Todo se multiplica por w_b para comparar con enteros: U * w_b = P w_b + v_b * capacidad sobrante
+    upper = prefix_value * w_b + v_b * remaining
+    limit = (incumbent + 1) * w_b
+    fixed_in, fixed_out, core = [], [], []
+    for position, item in enumerate(order):
+        gap = abs(values[item] * w_b - v_b * weights[item])
+        if position != break_position and upper - gap < limit:
+            (fixed_in if position < break_position else fixed_out).append(item)
+        else:
+            core.append(item)
+    return fixed_in, fixed_out, core
+
+
+# Mejor valor con peso <= c para cada c en 0..capacity, o None si se pasa deadline
+def dp_values(weights, values, capacity, deadline=None):
+    best = np.zeros(capacity + 1, dtype=np.int64)
+    for weight, value in zip(weights, values):
+        if expired(deadline):
+            return None
+        if weight <= capacity:
+            np.maximum(best[weight:], best[:-weight] + value, out=best[weight:])
+    return best
+
+
+# DP densa que guarda en bits si cada artículo se toma en cada capacidad, para reconstruir la solución; None
+# si se pasa deadline
+def dp_with_items(weights, values, capacity, deadline=None):
+    best = np.zeros(capacity + 1, dtype=np.int64)
+    keep = []
+    for weight, value in zip(weights, values):
+        if expired(deadline):
+            return None
+        if weight > capacity:
+            keep.append(None)
+            continue
+        candidate = best[:-weight] + value
+        take = candidate > best[weight:]
+        best[weight:] = np.where(take, candidate, best[weight:])
+        keep.append(np.packbits(np.concatenate([np.zeros(weight, dtype=bool), take])))
+
+    chosen = []
+    for position in range(len(weights) - 1, -1, -1):
+        bits = keep[position]
+        if bits is not None and (bits[capacity >> 3] >> (7 - (capacity & 7))) & 1:
+            chosen.append(position)
+            capacity -= weights[position]
+    return chosen[::-1]
+
+
+# DP densa con reconstrucción en memoria acotada: si los bits de decisión no caben, se calculan las DP de
+# las dos mitades de los artículos, se elige cómo repartir la capacidad entre ellas y se resuelve cada una.
+# None si se pasa deadline.
+def dense_solve(weights, values, capacity, deadline=None):
+    if len(weights) * (capacity + 1) <= KEEP_BITS_LIMIT or len(weights) == 1:
+        return dp_with_items(weights, values, capacity, deadline)
+    half = len(weights) // 2
+    left = dp_values(weights[:half], values[:half], capacity, deadline)
+    right = None if left is None else dp_values(weights[half:], values[half:], capacity, deadline)
+    if right is None:
+        return None
+    split = int(np.argmax(left + right[::-1]))
+    first = dense_solve(weights[:half], values[:half], split, deadline)
+    second = None if first is None else dense_solve(weights[half:], values[half:], capacity - split, deadline)
+    if second is None:
+        return None
+    return first + [half + position for position in second]
+
+
+# Fronteras de Pareto dispersas: después de cada artículo se guardan solo los estados (peso, valor) que
+# ningún otro domina (menos peso y más valor), y se descartan los que con la cota fraccionaria de los
+# artículos que faltan no pueden pasar del mejor valor conocido. Cada estado lleva sus artículos como bits.
+# Regresa los artículos del mejor estado y si se terminó; si se pasa deadline es el mejor encontrado.
+def frontier_solve(weights, values, capacity, incumbent=0, deadline=None):
+    bound = FractionalBound({'values': values, 'weights': weights, 'capacity': capacity})
+    frontier = [(0, 0, 0)]
+    best_value, best_mask = 0, 0
+    complete = True
+    for position, (weight, value) in enumerate(zip(weights, values)):
+        if expired(deadline):
+            complete = False
+            break
+        taken = [(state_weight + weight, state_value + value, mask | (1 << position))
+                 for state_weight, state_value, mask in frontier if state_weight + weight <= capacity]
+        merged = []
+        i = j = 0
+        while i < len(frontier) or j < len(taken):
+            if (i + j) % MERGE_CHECK_EVERY == 0 and expired(deadline):
+                complete = False
+                break
+            # Mezcla por peso; a igual peso primero el de más valor
+            if j == len(taken) or (i < len(frontier)
+                                   and (frontier[i][0], -frontier[i][1]) <= (taken[j][0], -taken[j][1])):
+                state = frontier[i]
+                i += 1
+            else:
+                state = taken[j]
+                j += 1
+            # Ordenados por peso, un estado solo sirve si tiene más valor que todos los más ligeros
+            if merged and state[1] <= merged[-1][1]:
+                continue
+            if state[1] > best_value:
+                best_value, best_mask = state[1], state[2]
+            merged.append(state)
+        if not complete:
+            break
+
+        target = max(best_value, incumbent)
+        frontier = [state for state in merged
+                    if state[2] == best_mask or state[1] + bound.value(position + 1, capacity - state[0]) > target]
+    return [position for position in range(len(weights)) if best_mask >> position & 1], complete
+
+
+# Solver exacto de la mochila 0/1. Primero se reduce el problema con la solución voraz y la reducción de
+# Dembo y Hammer; el núcleo que queda se resuelve con la DP densa ('dp') o con fronteras de Pareto
+# ('frontier'). Con 'auto' se usa la DP si la capacidad del núcleo no es demasiado grande.
+# Regresa el valor óptimo y los índices de los artículos elegidos. Si se acaba time_limit (segundos) antes de
+# terminar, optimal es False y la solución es la mejor que se tenga: la de la frontera hasta ese momento o,
+# con la DP, la voraz.
+def solve_exact(problem, method='auto', time_limit=None):
+    start = time.perf_counter()
+    deadline = None if time_limit is None else start + time_limit
+    check_problem(problem)
+    values, weights = problem['values'], problem['weights']
+    order = ratio_order(problem)
+    incumbent, greedy_items = greedy(problem, order)
+    fixed_in, fixed_out, core = reduce_items(problem, order, incumbent)
+
+    capacity = problem['capacity'] - sum(weights[item] for item in fixed_in)
+    core_weights = [weights[item] for item in core]
+    core_values = [values[item] for item in core]
+    if method == 'auto':
+        method = 'dp' if capacity <= DENSE_CAPACITY_LIMIT else 'frontier'
+    optimal = True
+    if method == 'dp':
+        chosen = dense_solve(core_weights, core_values, capacity, deadline) if core else []
+        if chosen is None:
+            chosen, optimal = [], False
+    elif method == 'frontier':
+        fixed_value = sum(values[item] for item in fixed_in)
+        chosen, optimal = (frontier_solve(core_weights, core_values, capacity, incumbent - fixed_value, deadline)
+                           if core else ([], True))
+    else:
+        raise ValueError(f"Método desconocido {method!r}")
+
+    items = fixed_in + [core[position] for position in chosen]
+    value = sum(values[item] for item in items)
+    # Si la solución voraz ya era óptima puede que ninguna solución con los artículos fijos la mejore
+    if incumbent > value:
+        items, value = greedy_items, incumbent
+    items.sort()
+    return {
+        'value': value,
+        'items': items,
+        'weight': sum(weights[item] for item in items),
+        'optimal': optimal,
+        'method': method,
+        'core': len(core),
+        'time': time.perf_counter() - start,
+    }
@@ -0,0 +1,136 @@
+import glob
+import hashlib
+import os
+
+import numpy as np
+
+# Formatos de instancia:
+#   plain      una línea "valor peso" por artículo, sin encabezado (ks_10000_0.csv); la capacidad se da aparte
+#   header     primera línea "n capacidad" y luego n líneas "valor peso" (formato de los archivos ks_* y de
+#              las instancias grandes de Pisinger); lo que siga a los n artículos (p. ej. la solución) se ignora
+#   pisinger   bloques con nombre y líneas "n", "c", "z", "time", luego "i,valor,peso,x" por artículo y
+#              "-----" al final de cada instancia (knapPI_*.csv); se lee la instancia number
+PLAIN = 'plain'
+HEADER = 'header'
+PISINGER = 'pisinger'
+
+# Tamaño de los bloques al leer el archivo en binario (hash y conteo de líneas)
+HASH_CHUNK = 1 << 20
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def detect_format(path):
+    with open(path, 'rb') as file:
+        first = file.readline().split()
+        if len(first) != 2 or not all(token.lstrip(b'-').isdigit() for token in first):
+            return PISINGER
+        # Con encabezado, el primer número es cuántos artículos siguen (más a lo mucho una línea con la
+        # solución); las líneas se cuentan por bloques sin pasar por Python línea por línea
+        expected = int(first[0])
+        count = 0
+        last = b'\n'
+        for chunk in iter(lambda: file.read(HASH_CHUNK), b''):
+            count += chunk.count(b'\n')
+            last = chunk[-1:]
+        count += last != b'\n'
+        return HEADER if expected <= count <= expected + 1 else PLAIN
+
+
+def parse_plain(path):
+    items = np.loadtxt(path, dtype=np.int64, usecols=(0, 1), ndmin=2)
+    return items, None
+
+
+def parse_header(path):
+    with open(path, 'r') as file:
+        n, capacity = (int(token) for token in file.readline().split())
+    items = np.loadtxt(path, dtype=np.int64, skiprows=1, max_rows=n, usecols=(0, 1), ndmin=2)
+    if len(items) != n:
+        raise ValueError(f"{path}: se esperaban {n} artículos y hay {len(items)}")
+    return items, capacity
+
+
+def parse_pisinger(path, number=0):
+    with open(path, 'r') as file:
+        current = -1
+        header = {}
+        lines = []
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('-----'):
+                if current == number:
+                    break
+                header, lines = {}, []
+                continue
+            if not header and not lines and not line[0].isdigit():
+                if ' ' not in line:
+                    # Nombre de la instancia: empieza una nueva
+                    current += 1
+                    continue
+            if current != number:
+                continue
+            key, _, rest = line.partition(' ')
+            if key in ('n', 'c', 'z', 'time'):
+                header[key] = rest
+            else:
+                lines.append(line)
+    if current < number or 'n' not in header:
+        raise ValueError(f"{path}: no hay instancia número {number}")
+    items = np.loadtxt(lines, dtype=np.int64, delimiter=',', usecols=(1, 2), ndmin=2)
+    if len(items) != int(header['n']):
+        raise ValueError(f"{path}: se esperaban {header['n']} artículos y hay {len(items)}")
+    return items, int(header['c'])
+
+
+PARSERS = {PLAIN: parse_plain, HEADER: parse_header, PISINGER: parse_pisinger}
+
+
+# Leer una instancia como arreglos int64 de NumPy. La primera vez se guarda una copia binaria junto al
+# archivo (nombre.<hash>.npy, con el hash del contenido), y las siguientes se abre con memory map sin
+# volver a leer el texto. En el .npy la fila 0 es (capacidad, n), con capacidad -1 si el archivo no la
+# trae, y las demás filas son (valor, peso). capacity, si se da, reemplaza la del archivo; default_capacity
+# solo se usa si el archivo no la trae.
+def load_instance(path, capacity=None, file_format=None, number=0, cache=True, mmap=True, default_capacity=None):
+    if file_format is not None and file_format not in PARSERS:
+        raise ValueError(f"Formato desconocido {file_format!r}")
+    cache_path = None
+    table = None
+    if cache:
+        suffix = f".{number}" if number else ''
+        cache_path = f"{path}{suffix}.{file_digest(path)[:16]}.npy"
+        if os.path.exists(cache_path):
+            table = np.load(cache_path, mmap_mode='r' if mmap else None)
+
+    if table is None:
+        file_format = file_format or detect_format(path)
+        items, file_capacity = (parse_pisinger(path, number) if file_format == PISINGER
+                                else PARSERS[file_format](path))
+        table = np.empty((len(items) + 1, 2), dtype=np.int64)
+        table[0] = (-1 if file_capacity is None else file_capacity, len(items))
+        table[1:] = items
+        if cache_path:
+            # Las copias de versiones anteriores del archivo ya no sirven
+            for old in glob.glob(glob.escape(f"{path}{suffix}.") + '?' * 16 + '.npy'):
+                os.remove(old)
+            np.save(cache_path, table)
+
+    if capacity is None:
+        capacity = int(table[0, 0])
+        if capacity < 0 and default_capacity is not None:
+            capacity = default_capacity
+        elif capacity < 0:
+            raise ValueError(f"{path} no trae la capacidad; hay que darla con capacity")
+    return {
+        'values': table[1:, 0],
+        'weights': table[1:, 1],
+        'capacity': capacity,
+    }
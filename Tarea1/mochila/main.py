@@ -1,68 +1,145 @@
-import heapq
-import csv
-from tqdm import tqdm
-
-
-def graph_search(problem, heuristic=None):
-    fringe = []  # Priority queue for A*
-    closed = set()  # Set for explored states
+import math
+import os
+import sys
+from bisect import bisect_left, bisect_right
+
+from bound import FractionalBound
+from branch_and_bound import branch_and_bound
+from exact import greedy, ratio_order, solve_exact, sort_by_ratio
+from loader import load_instance
+from telemetry import Telemetry
+
+# The priority queue lives in Tarea1/ and is shared with the A* task
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from priority_queue import IndexedHeap  # noqa: E402
+
+# Slack for rounding errors in a fractional bound before taking its integer part
+BOUND_TOLERANCE = 1e-6
+
+
+# With a Telemetry object, the search reports its counters to it every telemetry.every expansions and its
+# final metrics are left in telemetry.metrics
+def graph_search(problem, heuristic=None, telemetry=None):
+    fringe = IndexedHeap()  # Priority queue for A*, with one entry per state
+    bounds = {}  # Integer upper bound of the final value for each state in the fringe
     parent = {}  # Dictionary to track the parents of each node
-    cost_so_far = {}  # Dictionary to track the cost so far (weight_so_far)
+    frontier = FrontierIndex()  # Non-dominated (weight, value) pairs per item index
 
     # Start with the initial state
-    start_node = make_node((0, 0, 0))  # (index, current_weight, current_value)
-    start_state = state(start_node)
+    start_state = (0, 0, 0)  # (index, current_weight, current_value)
 
-    # Initialize the priority queue with the start node
+    # Initialize the priority queue with the start node; ties go to the state with the lower heuristic
     initial_priority = heuristic(start_state, problem) if heuristic else 0
-    heapq.heappush(fringe, (initial_priority, start_node))
+    fringe.push(start_state, initial_priority, initial_priority)
+    bounds[start_state] = math.floor(initial_priority + BOUND_TOLERANCE)
+    frontier.add(start_state)
     parent[start_state] = None  # The initial state has no parent
-    cost_so_far[start_state] = 0  # Weight to reach the initial state is 0
 
-    best_value = 0
-    pbar = tqdm(total=problem['capacity'], desc="Mochila", unit="units")
+    # With a bound heuristic, start from the greedy solution so bad branches are pruned from the beginning
+    best_value = greedy(problem, ratio_order(problem))[0] if heuristic else 0
+    expansions = pushes = 0
+
+    def push(next_state, current_state):
+        nonlocal pushes
+        # Skip states that are dominated by (or equal to) one already in the fringe, and take out of the
+        # fringe the ones the new state dominates
+        dominated = []
+        if not frontier.add(next_state, dominated):
+            return
+        for old_state in dominated:
+            if old_state in fringe:
+                fringe.remove(old_state)
+                del bounds[old_state]
+        bound = heuristic(next_state, problem) if heuristic else 0
+        # The heuristic is an upper bound of the value still to gain and values are integers, so this state
+        # cannot beat best_value if the integer part of its bound does not
+        next_bound = math.floor(next_state[2] + bound + BOUND_TOLERANCE)
+        if heuristic and next_bound <= best_value:
+            return
+        fringe.push(next_state, -next_state[2] + bound, bound)
+        bounds[next_state] = next_bound
+        parent[next_state] = current_state
+        pushes += 1
+
+    # Without a heuristic there is no upper bound; with one, no state can beat the best bound in the fringe
+    def upper_bound():
+        if not heuristic:
+            return None
+        return max([best_value] + list(bounds.values()))
 
     while fringe:
-        _, node = heapq.heappop(fringe)
-        current_state = state(node)
+        current_state, _ = fringe.pop()
+        bound = bounds.pop(current_state)
         index, current_weight, current_value = current_state
 
-        # Update the progress bar
-        pbar.n = current_weight  # Update the current progress
-        pbar.refresh()
+        # Drop states the best value no longer lets improve
+        if heuristic and bound <= best_value:
+            frontier.discard(current_state)
+            continue
+
+        expansions += 1
+        if telemetry is not None and expansions % telemetry.every == 0:
+            telemetry.sample(expansions, pushes, len(fringe), best_value, upper_bound)
 
         if index == len(problem['values']):
             best_value = max(best_value, current_value)
             continue
 
         # Option 1: Don't take the current item
-        next_state = (index + 1, current_weight, current_value)
-        next_priority = -next_state[2] + (heuristic(next_state, problem) if heuristic else 0)
-        heapq.heappush(fringe, (next_priority, make_node(next_state)))
-        parent[next_state] = current_state
+        push((index + 1, current_weight, current_value), current_state)
 
         # Option 2: Take the current item (if it doesn't exceed capacity)
         item_weight = problem['weights'][index]
         if current_weight + item_weight <= problem['capacity']:
             new_weight = current_weight + item_weight
             new_value = current_value + problem['values'][index]
-            next_state = (index + 1, new_weight, new_value)
-            next_priority = -next_state[2] + (heuristic(next_state, problem) if heuristic else 0)
-            heapq.heappush(fringe, (next_priority, make_node(next_state)))
-            parent[next_state] = current_state
-
             best_value = max(best_value, new_value)
+            push((index + 1, new_weight, new_value), current_state)
 
-    pbar.close()
+    if telemetry is not None:
+        # The fringe is empty: the best value is optimal
+        telemetry.finish(expansions, pushes, 0, best_value, best_value if heuristic else None)
     return best_value
 
 
-def make_node(state):
-    return {'state': state}
-
-
-def state(node):
-    return node['state']
+# Pareto frontier of the states pushed for each item index: sorted by weight with strictly increasing
+# value, so a state is dominated if the last one that weighs no more has at least its value
+class FrontierIndex:
+    def __init__(self):
+        self.weights = {}
+        self.values = {}
+
+    def contains(self, state):
+        index, weight, value = state
+        weights = self.weights.get(index, [])
+        position = bisect_left(weights, weight)
+        return position < len(weights) and weights[position] == weight and self.values[index][position] == value
+
+    # Add a state unless it is dominated; the states it dominates are removed (and appended to dominated if
+    # given). Returns whether it was added.
+    def add(self, state, dominated=None):
+        index, weight, value = state
+        weights = self.weights.setdefault(index, [])
+        values = self.values.setdefault(index, [])
+        position = bisect_right(weights, weight)
+        if position and values[position - 1] >= value:
+            return False
+        end = position
+        while end < len(weights) and values[end] <= value:
+            end += 1
+        start = position - 1 if position and weights[position - 1] == weight else position
+        if dominated is not None:
+            dominated.extend((index, weights[k], values[k]) for k in range(start, end))
+        weights[start:end] = [weight]
+        values[start:end] = [value]
+        return True
+
+    def discard(self, state):
+        index, weight, value = state
+        if self.contains(state):
+            position = bisect_left(self.weights[index], weight)
+            del self.weights[index][position]
+            del self.values[index][position]
 
 
 def goal_test(problem, state):
@@ -137,26 +214,30 @@ if __name__ == '__main__':
         'capacity': 31181
     }
 
-    max_value = graph_search(problem, heuristic=mochila_heuristica)
+    telemetry = Telemetry("Mochila")
+    max_value = graph_search(problem, heuristic=mochila_heuristica, telemetry=telemetry)
 
-    print(f"Valor máximo posible en la mochila: {max_value}")
+    print(f"Valor máximo posible en la mochila: {max_value} ({telemetry.metrics['expansiones']} expansiones)")
 
-    # 1K
-    with open('ks_10000_0.csv', 'r') as archivo:
-        lector = csv.reader(archivo, delimiter=' ')
+    # 10K: la capacidad no viene en el archivo
+    problem = load_instance('ks_10000_0.csv', capacity=1000000)
+    # Los solvers recorren los artículos en Python, donde las listas de enteros son más rápidas
+    problem = dict(problem, values=problem['values'].tolist(), weights=problem['weights'].tolist())
 
-        filas = list(lector)[:]
+    result = solve_exact(problem)
+    print(f"Valor óptimo (solver exacto, {result['method']}): {result['value']} con {len(result['items'])} "
+          f"artículos en {result['time']:.2f}s")
 
-    values = [int(fila[0]) for fila in filas]
-    weights = [int(fila[1]) for fila in filas]
-
-    problem = {
-        'values': values,
-        'weights': weights,
-        'capacity': 1000000
-    }
+    result = branch_and_bound(problem)
+    print(f"Valor óptimo (branch and bound): {result['value']} con {len(result['items'])} artículos, "
+          f"{result['nodes']} nodos ({result['nodes_per_second']:.0f} nodos/s)")
 
-    max_value = graph_search(problem, heuristic=mochila_heuristica_optimizada)
+    # Misma cota que mochila_heuristica_optimizada, precalculada una sola vez para los 10,000 artículos.
+    # En orden de valor/peso las cotas de los primeros niveles ya son ajustadas y se poda casi todo.
+    problem = sort_by_ratio(problem)
+    telemetry = Telemetry("Mochila 10K")
+    max_value = graph_search(problem, heuristic=FractionalBound(problem), telemetry=telemetry)
 
-    print(f"Valor máximo posible en la mochila: {max_value}")
+    print(f"Valor máximo posible en la mochila: {max_value} ({telemetry.metrics['expansiones']} expansiones, "
+          f"frontera máxima {telemetry.metrics['frontera_max']})")
 
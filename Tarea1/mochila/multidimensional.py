@@ -0,0 +1,121 @@
+import math
+import time
+
+from bound import FractionalBound
+from branch_and_bound import CHECK_EVERY
+
+# Holgura para errores de redondeo de las cotas en punto flotante antes de tomar su parte entera
+BOUND_TOLERANCE = 1e-6
+
+
+# Mochila multidimensional: weights es una lista de m listas (una por restricción) y capacity una lista
+# de m capacidades; un conjunto de artículos es válido si cabe en todas
+def check_multidimensional(problem):
+    weights, capacity = problem['weights'], problem['capacity']
+    if len(weights) != len(capacity):
+        raise ValueError("Se necesita una capacidad por cada restricción")
+    if any(len(row) != len(problem['values']) for row in weights):
+        raise ValueError("Cada restricción debe tener un peso por artículo")
+    if any(limit < 0 for limit in capacity) or any(weight < 0 for row in weights for weight in row):
+        raise ValueError("Los pesos y capacidades no pueden ser negativos")
+    if any(value < 0 for value in problem['values']):
+        raise ValueError("Los valores no pueden ser negativos")
+
+
+def is_multidimensional(problem):
+    return isinstance(problem['capacity'], (list, tuple))
+
+
+# Cota superior: el mínimo entre la relajación subrogada (cada restricción dividida entre su capacidad y
+# todas sumadas, con capacidad m) y la cota fraccionaria de cada restricción por separado. Cada una es la
+# cota de Dantzig de una mochila de una dimensión que contiene al problema original.
+class MultidimensionalBound:
+    def __init__(self, values, weights, capacity):
+        self.capacity = capacity
+        self.n = len(values)
+        surrogate = [sum(row[item] / limit for row, limit in zip(weights, capacity) if limit)
+                     for item in range(self.n)]
+        self.surrogate = FractionalBound({'values': values, 'weights': surrogate, 'capacity': len(capacity)})
+        # Una restricción con pesos cero no se puede usar como mochila de Dantzig; la cubre la subrogada
+        self.dimensions = [(dimension, FractionalBound({'values': values, 'weights': row, 'capacity': limit}))
+                           for dimension, (row, limit) in enumerate(zip(weights, capacity)) if all(row)]
+
+    def value(self, index, used):
+        surrogate_left = sum((limit - amount) / limit for limit, amount in zip(self.capacity, used) if limit)
+        best = self.surrogate.value(index, surrogate_left)
+        for dimension, bound in self.dimensions:
+            best = min(best, bound.value(index, self.capacity[dimension] - used[dimension]))
+        return best
+
+
+# Branch and bound en profundidad para la mochila multidimensional, igual que branch_and_bound: artículos
+# en orden de valor entre peso subrogado, primero tomar y luego dejar, con la solución voraz como primera
+# solución conocida. Los artículos sin peso en ninguna restricción se toman desde el principio.
+def multidimensional_branch_and_bound(problem, time_limit=None, node_limit=None):
+    start = time.perf_counter()
+    check_multidimensional(problem)
+    values, weights, capacity = problem['values'], problem['weights'], problem['capacity']
+    n_dimensions = len(capacity)
+
+    # Los artículos que por sí solos no caben nunca se toman; así los que quedan no tienen peso en las
+    # restricciones de capacidad cero y su peso subrogado solo es cero si no pesan nada
+    fitting = [item for item in range(len(values))
+               if all(row[item] <= limit for row, limit in zip(weights, capacity))]
+    free = [item for item in fitting if not any(row[item] for row in weights)]
+    rest = [item for item in fitting if any(row[item] for row in weights)]
+    surrogate = {item: sum(row[item] / limit for row, limit in zip(weights, capacity) if limit) for item in rest}
+    order = sorted(rest, key=lambda item: values[item] / surrogate[item], reverse=True)
+    item_values = [values[item] for item in order]
+    item_weights = [tuple(row[item] for row in weights) for item in order]
+    bound = MultidimensionalBound(item_values, [[row[item] for item in order] for row in weights], capacity)
+
+    def fits(used, item_weight):
+        return all(amount + weight <= limit for amount, weight, limit in zip(used, item_weight, capacity))
+
+    # Voraz en el mismo orden
+    best_value, best_positions = 0, []
+    used = (0,) * n_dimensions
+    for position, item_weight in enumerate(item_weights):
+        if fits(used, item_weight):
+            used = tuple(amount + weight for amount, weight in zip(used, item_weight))
+            best_value += item_values[position]
+            best_positions.append(position)
+
+    taken = [False] * len(order)
+    stack = [(0, (0,) * n_dimensions, 0, False)]
+    nodes = 0
+    complete = True
+    while stack:
+        position, used, value, took = stack.pop()
+        if position:
+            taken[position - 1] = took
+        nodes += 1
+        if nodes % CHECK_EVERY == 0 and ((time_limit is not None and time.perf_counter() - start > time_limit)
+                                         or (node_limit is not None and nodes > node_limit)):
+            complete = False
+            break
+
+        if value > best_value:
+            best_value = value
+            best_positions = [k for k in range(position) if taken[k]]
+        if position == len(order):
+            continue
+        if value + math.floor(bound.value(position, used) + BOUND_TOLERANCE) <= best_value:
+            continue
+
+        stack.append((position + 1, used, value, False))
+        if fits(used, item_weights[position]):
+            new_used = tuple(amount + weight for amount, weight in zip(used, item_weights[position]))
+            stack.append((position + 1, new_used, value + item_values[position], True))
+
+    items = sorted(free + [order[position] for position in best_positions])
+    elapsed = time.perf_counter() - start
+    return {
+        'value': best_value + sum(values[item] for item in free),
+        'items': items,
+        'weight': [sum(row[item] for item in items) for row in weights],
+        'optimal': complete,
+        'nodes': nodes,
+        'time': elapsed,
+        'nodes_per_second': nodes / elapsed if elapsed else None,
+    }
@@ -0,0 +1,82 @@
+import json
+import time
+
+from tqdm import tqdm
+
+# Cada cuántas expansiones las búsquedas le pasan sus contadores a la telemetría
+SAMPLE_EVERY = 4096
+# Segundos mínimos entre dos actualizaciones de la barra de progreso
+PROGRESS_INTERVAL = 0.5
+
+
+# Telemetría de una búsqueda: las búsquedas llevan sus contadores en variables locales y cada SAMPLE_EVERY
+# expansiones llaman a sample; solo cuando pasa PROGRESS_INTERVAL se calcula la cota (que puede ser cara,
+# por eso se puede dar como función) y se escribe la barra. Sin telemetría (telemetry=None) a la búsqueda
+# solo le queda comparar telemetry con None en cada expansión.
+# Al terminar, finish guarda en metrics las expansiones, inserciones a la frontera, tamaño de la frontera
+# (el actual y el máximo muestreado), mejor valor, cota superior y la brecha relativa entre los dos.
+class Telemetry:
+    def __init__(self, desc="Búsqueda", progress=True, interval=PROGRESS_INTERVAL, every=SAMPLE_EVERY):
+        self.desc = desc
+        self.progress = progress
+        self.interval = interval
+        self.every = every
+        self.start = time.perf_counter()
+        self.next_refresh = self.start
+        self.pbar = tqdm(desc=desc, unit="nodos", mininterval=interval) if progress else None
+        self.expansions = 0
+        self.pushes = 0
+        self.fringe = 0
+        self.max_fringe = 0
+        self.best = None
+        self.bound = None
+        self.metrics = None
+
+    def sample(self, expansions, pushes, fringe, best, bound=None):
+        self.expansions, self.pushes, self.fringe, self.best = expansions, pushes, fringe, best
+        self.max_fringe = max(self.max_fringe, fringe)
+        now = time.perf_counter()
+        if self.progress and now >= self.next_refresh:
+            self.next_refresh = now + self.interval
+            self.bound = bound() if callable(bound) else bound
+            self.pbar.n = expansions
+            self.pbar.set_postfix_str(self.summary(), refresh=False)
+            self.pbar.refresh()
+
+    def finish(self, expansions, pushes, fringe, best, bound=None):
+        self.expansions, self.pushes, self.fringe, self.best = expansions, pushes, fringe, best
+        self.max_fringe = max(self.max_fringe, fringe)
+        self.bound = bound() if callable(bound) else bound
+        elapsed = time.perf_counter() - self.start
+        if self.pbar is not None:
+            self.pbar.n = expansions
+            self.pbar.set_postfix_str(self.summary(), refresh=False)
+            self.pbar.close()
+        self.metrics = {
+            'expansiones': expansions,
+            'inserciones': pushes,
+            'frontera': fringe,
+            'frontera_max': self.max_fringe,
+            'mejor': best,
+            'cota': self.bound,
+            'brecha': self.gap(),
+            'tiempo': elapsed,
+            'expansiones_por_segundo': expansions / elapsed if elapsed else None,
+        }
+        return self.metrics
+
+    # Brecha relativa entre la mejor solución y la cota superior (0 si ya se probó óptima)
+    def gap(self):
+        if self.best is None or self.bound is None:
+            return None
+        return max(self.bound - self.best, 0) / max(abs(self.bound), 1)
+
+    def summary(self):
+        gap = self.gap()
+        text = f"mejor={self.best} frontera={self.fringe}"
+        return text if gap is None else f"{text} cota={self.bound} brecha={gap:.4%}"
+
+    # Agregar las métricas como una línea JSON al archivo
+    def export(self, path):
+        with open(path, 'a') as file:
+            file.write(json.dumps(dict(self.metrics, busqueda=self.desc), ensure_ascii=False) + '\n')
@@ -0,0 +1,101 @@
+# Compartido por A/main.py y mochila/main.py, que agregan Tarea1 a sys.path para importarlo
+#
+# Cola de prioridad indexada: un heap binario con a lo más una entrada por llave (el estado) y un dict con
+# la posición de cada llave, para bajar la prioridad de un estado que ya está en la cola (decrease-key) en
+# lugar de meter otra entrada. Los empates se deciden por tie (la heurística: menor primero) y luego por
+# orden de inserción, así que nunca se comparan las llaves y el orden de salida es reproducible.
+class IndexedHeap:
+    def __init__(self):
+        self.heap = []  # Entradas (prioridad, desempate, orden de inserción, llave)
+        self.position = {}
+        self.count = 0
+        self.max_size = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __bool__(self):
+        return bool(self.heap)
+
+    def __contains__(self, key):
+        return key in self.position
+
+    def __iter__(self):
+        return (entry[3] for entry in self.heap)
+
+    def priority(self, key):
+        return self.heap[self.position[key]][0]
+
+    # Entrada mínima (prioridad, desempate, orden, llave) sin sacarla
+    def peek(self):
+        return self.heap[0]
+
+    # Meter key o bajar su prioridad. Si ya está con una prioridad igual o menor no cambia nada.
+    # Regresa si se metió o se bajó.
+    def push(self, key, priority, tie=0):
+        if key in self.position:
+            index = self.position[key]
+            entry = self.heap[index]
+            if (priority, tie) >= entry[:2]:
+                return False
+            # Conserva su orden de inserción
+            self.heap[index] = (priority, tie, entry[2], key)
+            self._sift_up(index)
+            return True
+        self.heap.append((priority, tie, self.count, key))
+        self.count += 1
+        self.position[key] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1)
+        if len(self.heap) > self.max_size:
+            self.max_size = len(self.heap)
+        return True
+
+    # Sacar la llave con menor prioridad; regresa (llave, prioridad)
+    def pop(self):
+        entry = self.heap[0]
+        self._delete(0)
+        return entry[3], entry[0]
+
+    def remove(self, key):
+        self._delete(self.position[key])
+
+    def _delete(self, index):
+        heap = self.heap
+        del self.position[heap[index][3]]
+        last = heap.pop()
+        if index < len(heap):
+            heap[index] = last
+            self.position[last[3]] = index
+            self._sift_up(index)
+            self._sift_down(self.position[last[3]])
+
+    def _sift_up(self, index):
+        heap, position = self.heap, self.position
+        entry = heap[index]
+        while index:
+            parent = (index - 1) >> 1
+            if heap[parent] <= entry:
+                break
+            heap[index] = heap[parent]
+            position[heap[index][3]] = index
+            index = parent
+        heap[index] = entry
+        position[entry[3]] = index
+
+    def _sift_down(self, index):
+        heap, position = self.heap, self.position
+        size = len(heap)
+        entry = heap[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1] < heap[child]:
+                child += 1
+            if entry <= heap[child]:
+                break
+            heap[index] = heap[child]
+            position[heap[index][3]] = index
+            index = child
+        heap[index] = entry
+        position[entry[3]] = index
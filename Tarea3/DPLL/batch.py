@@ -0,0 +1,212 @@
+import argparse
+import json
+import lzma
+import multiprocessing
+import os
+import queue
+import sys
+import tarfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from dimacs import is_archive, is_cnf, load_archive, load_formula
+from main import CACHE_DIR, CDCL_METHOD, DPLL, get_symbols_from_clauses, make_solver
+from preprocess import Preprocessor
+
+# Segundos máximos por instancia
+TIME_LIMIT = 60
+SAT = 'SAT'
+UNSAT = 'UNSAT'
+UNKNOWN = 'UNKNOWN'
+STATUS = {True: SAT, False: UNSAT, None: UNKNOWN}
+# Errores al leer una instancia: archivo inexistente o corrupto, DIMACS inválido, tar o .xz dañado
+READ_ERRORS = (OSError, ValueError, EOFError, tarfile.TarError, lzma.LZMAError)
+
+
+# Resolver una fórmula ya leída. El límite de tiempo lo revisan los solvers cada cierto número de
+# conflictos; si se acaba el resultado es UNKNOWN. Con model se agregan los literales verdaderos (como en
+# DIMACS: v o -v) de un modelo si es SAT. Con preprocess la fórmula se simplifica antes de la búsqueda y el
+# resultado lleva las estadísticas del preproceso (el tiempo de este cuenta dentro del límite).
+def solve_formula(formula, time_limit=TIME_LIMIT, method=CDCL_METHOD, seed=None, model=False, start=None,
+                  preprocess=False):
+    start = time.perf_counter() if start is None else start
+    clauses, symbols = formula.clauses(), formula.symbols()
+    preprocessor = None
+    if preprocess:
+        preprocessor = Preprocessor(clauses, symbols)
+        clauses = preprocessor.run()
+        symbols = get_symbols_from_clauses(clauses)
+        if time_limit is not None:
+            time_limit = max(time_limit - preprocessor.stats['tiempo'], 0)
+    solver = make_solver(clauses, symbols, method, seed)
+    satisfiable = solver.solve(time_limit)
+    result = {
+        'instancia': formula.name,
+        'resultado': STATUS[satisfiable],
+        'metodo': method,
+        'semilla': seed,
+        'simbolos': formula.num_variables,
+        'clausulas': len(formula),
+        'conflictos': solver.conflicts,
+        'decisiones': solver.decisions,
+        'tiempo': time.perf_counter() - start,
+    }
+    if preprocessor:
+        result['preproceso'] = preprocessor.stats
+    if model and satisfiable:
+        values = preprocessor.extend(solver.model()) if preprocessor else solver.model()
+        result['modelo'] = [variable if value else -variable for variable, value in sorted(values.items())]
+    return result
+
+
+# Leer y resolver un archivo en un proceso del pool; un archivo inválido da un resultado con "error"
+def solve_file(path, time_limit=TIME_LIMIT, method=CDCL_METHOD, seed=None, model=False, cache_dir=None,
+               preprocess=False):
+    start = time.perf_counter()
+    try:
+        formula = load_formula(path, cache_dir=cache_dir)
+    except READ_ERRORS as error:
+        return error_result(os.path.basename(path), error, start)
+    return solve_formula(formula, time_limit, method, seed, model, start, preprocess)
+
+
+def error_result(name, error, start):
+    return {'instancia': name, 'error': f"{type(error).__name__}: {error}", 'tiempo': time.perf_counter() - start}
+
+
+# Archivos de un directorio que son CNF o tar con instancias
+def list_sources(directory):
+    return [os.path.join(directory, file_name) for file_name in sorted(os.listdir(directory))
+            if os.path.isfile(os.path.join(directory, file_name))
+            and (is_cnf(file_name) or is_archive(file_name))]
+
+
+# Las fórmulas de los tar se leen aquí, una pasada por archivo, y se mandan ya leídas al pool (si cada
+# proceso buscara su miembro, el tar se leería una vez por instancia). Con cache_dir los miembros que ya
+# están en el caché no se vuelven a interpretar.
+def submit_all(executor, sources, time_limit, method, seed, model, cache_dir, preprocess, output):
+    pending = set()
+    for path in sources:
+        if not is_archive(path):
+            pending.add(executor.submit(solve_file, path, time_limit, method, seed, model, cache_dir,
+                                        preprocess))
+            continue
+        start = time.perf_counter()
+        try:
+            for formula in load_archive(path, cache_dir):
+                pending.add(executor.submit(solve_formula, formula, time_limit, method, seed, model, None,
+                                            preprocess))
+        except READ_ERRORS as error:
+            write_result(output, error_result(os.path.basename(path), error, start))
+    return pending
+
+
+def write_result(output, result):
+    output.write(json.dumps(result, ensure_ascii=False) + '\n')
+    output.flush()
+
+
+# Resolver todas las instancias en paralelo; cada resultado se escribe como una línea JSON en cuanto termina
+def solve_batch(sources, output, workers=None, time_limit=TIME_LIMIT, method=CDCL_METHOD, seed=None, model=False,
+                cache_dir=None, preprocess=False):
+    if method not in (DPLL, CDCL_METHOD):
+        raise ValueError(f"Método desconocido {method!r}")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = submit_all(executor, sources, time_limit, method, seed, model, cache_dir, preprocess, output)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                write_result(output, future.result())
+
+
+# Configuraciones (método, semilla) del portafolio: CDCL sin semilla, el DPLL cronológico (otro orden de
+# decisiones) y luego CDCL con semillas distintas, que cambian el orden inicial y las polaridades
+def portfolio_configs(count):
+    configs = [(CDCL_METHOD, None), (DPLL, None)]
+    configs.extend((CDCL_METHOD, seed) for seed in range(1, count - 1))
+    return configs[:max(count, 1)]
+
+
+def portfolio_worker(formula, time_limit, method, seed, model, preprocess, results):
+    results.put(solve_formula(formula, time_limit, method, seed, model, None, preprocess))
+
+
+# Carrera de varios solvers sobre la misma fórmula, cada uno en su proceso: se regresa el primero que
+# decide SAT o UNSAT y se terminan los demás. Si todos se quedan sin tiempo el resultado es UNKNOWN.
+# No se usa el pool porque sus procesos no se pueden detener a medio cálculo.
+def portfolio(formula, configs, time_limit=TIME_LIMIT, model=False, preprocess=False):
+    start = time.perf_counter()
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=portfolio_worker, daemon=True,
+                                         args=(formula, time_limit, method, seed, model, preprocess, results))
+                 for method, seed in configs]
+    for process in processes:
+        process.start()
+    winner = None
+    try:
+        for _ in processes:
+            try:
+                # Margen por si un solver tarda en revisar su límite
+                result = results.get(timeout=None if time_limit is None else time_limit + 30)
+            except queue.Empty:
+                break
+            if result['resultado'] != UNKNOWN:
+                winner = result
+                break
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+    if winner is None:
+        winner = {'instancia': formula.name, 'resultado': UNKNOWN, 'simbolos': formula.num_variables,
+                  'clausulas': len(formula)}
+    winner['solvers'] = len(configs)
+    winner['tiempo'] = time.perf_counter() - start
+    return winner
+
+
+# Cada instancia se resuelve con el portafolio, una después de otra
+def solve_portfolio(sources, output, solvers=None, time_limit=TIME_LIMIT, model=False, cache_dir=None,
+                    preprocess=False):
+    configs = portfolio_configs(solvers or os.cpu_count() or 1)
+    for path in sources:
+        start = time.perf_counter()
+        try:
+            formulas = (load_archive(path, cache_dir) if is_archive(path)
+                        else [load_formula(path, cache_dir=cache_dir)])
+        except READ_ERRORS as error:
+            write_result(output, error_result(os.path.basename(path), error, start))
+            continue
+        for formula in formulas:
+            write_result(output, portfolio(formula, configs, time_limit, model, preprocess))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Resolver muchas instancias SAT en paralelo")
+    parser.add_argument('fuente', help="directorio con instancias .cnf (o .gz/.xz) y tar, o un solo archivo")
+    parser.add_argument('-o', '--salida', help="archivo JSONL de salida (por defecto la salida estándar)")
+    parser.add_argument('-w', '--procesos', type=int, default=None,
+                        help="procesos del pool (o solvers del portafolio)")
+    parser.add_argument('-t', '--tiempo', type=float, default=TIME_LIMIT, help="segundos máximos por instancia")
+    parser.add_argument('--metodo', choices=[DPLL, CDCL_METHOD], default=CDCL_METHOD)
+    parser.add_argument('--semilla', type=int, default=None, help="semilla de CDCL")
+    parser.add_argument('--portafolio', action='store_true',
+                        help="resolver cada instancia con varios solvers a la vez y quedarse con el primero")
+    parser.add_argument('--modelo', action='store_true', help="incluir el modelo de las instancias SAT")
+    parser.add_argument('--cache', default=CACHE_DIR, help="directorio de fórmulas ya leídas")
+    parser.add_argument('--preprocesar', action='store_true', help="simplificar cada fórmula antes de resolverla")
+    args = parser.parse_args()
+
+    sources = list_sources(args.fuente) if os.path.isdir(args.fuente) else [args.fuente]
+    output = open(args.salida, 'w') if args.salida else sys.stdout
+    try:
+        if args.portafolio:
+            solve_portfolio(sources, output, args.procesos, args.tiempo, args.modelo, args.cache,
+                            args.preprocesar)
+        else:
+            solve_batch(sources, output, args.procesos, args.tiempo, args.metodo, args.semilla, args.modelo,
+                        args.cache, args.preprocesar)
+    finally:
+        if args.salida:
+            output.close()
@@ -0,0 +1,371 @@
+import random
+import time
+
+from solver import CHECK_EVERY, FALSE, TRUE, UNASSIGNED, Solver
+
+# Factor con el que decae la actividad de los símbolos (EVSIDS) y de las cláusulas aprendidas
+VARIABLE_DECAY = 0.95
+CLAUSE_DECAY = 0.999
+# Por encima de este valor se reescalan todas las actividades para no desbordar el float
+RESCALE_LIMIT = 1e100
+# Conflictos por unidad de la sucesión de Luby entre reinicios
+RESTART_BASE = 100
+# Conflictos antes de la primera limpieza de cláusulas aprendidas y cuánto crece el intervalo cada vez
+REDUCE_FIRST = 1000
+REDUCE_INCREMENT = 100
+# Las cláusulas aprendidas con LBD de a lo más este valor ("glue") nunca se borran
+GLUE_LBD = 2
+# Búsqueda local (probSAT) para elegir las polaridades, en el nivel 0 después de un reinicio. La primera
+# caminata es en el primer reinicio (así las fórmulas fáciles no la pagan) y cada una de las siguientes
+# espera el doble de conflictos que la anterior; da WALK_RATIO pasos por conflicto hasta el momento y al
+# menos WALK_MIN_FLIPS. Un paso cuesta unas setenta veces menos que un conflicto.
+WALK_MIN_FLIPS = 100000
+WALK_RATIO = 10
+# probSAT: la probabilidad de cambiar un símbolo es proporcional a (WALK_EPS + rompe) ** -WALK_CB, donde
+# rompe es el número de cláusulas que dejarían de cumplirse
+WALK_CB = 2.06
+WALK_EPS = 0.9
+
+
+# Término i (desde 0) de la sucesión de Luby: 1 1 2 1 1 2 4 1 1 2 1 1 2 4 8 ...
+def luby(i):
+    size, exponent = 1, 0
+    while size < i + 1:
+        exponent += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        exponent -= 1
+        i %= size
+    return 2 ** exponent
+
+
+# CDCL: aprendizaje de cláusulas con el primer UIP, backjumping no cronológico, elección de símbolos por
+# actividad (EVSIDS: a los símbolos de cada conflicto se les suma una cantidad que crece geométricamente)
+# con la polaridad guardada de la última asignación, reinicios según la sucesión de Luby y limpieza
+# periódica de las cláusulas aprendidas por LBD (número de niveles distintos en la cláusula) y actividad.
+# De vez en cuando las polaridades se cambian por la mejor asignación de una búsqueda local (walk): en las
+# fórmulas aleatorias satisfacibles suele encontrar el modelo mucho antes que los conflictos.
+# Usa la propagación con watched literals y el trail de Solver.
+class CDCL(Solver):
+    def __init__(self, clauses, symbols=(), seed=None):
+        super().__init__(clauses, symbols)
+        n = len(self.variables)
+        rng = random.Random(seed)
+        # La caminata siempre usa una semilla para que las corridas sin semilla sean reproducibles
+        self.walk_rng = random.Random(0 if seed is None else seed)
+        self.walks = 0
+        # Con semilla, un poco de ruido en la actividad inicial y polaridades al azar cambian las primeras
+        # decisiones (así se diversifican los solvers del portafolio de batch.py)
+        self.activity = [rng.random() * 1e-5 if seed is not None else 0.0 for _ in range(n)]
+        self.variable_increment = 1.0
+        self.polarity = [rng.choice((TRUE, FALSE)) if seed is not None else FALSE for _ in range(n)]
+        self.learned = set()
+        self.clause_activity = {}
+        self.clause_increment = 1.0
+        self.lbd = {}
+        self.seen = [False] * n
+        self.restarts = 0
+        # Heap de máximos de los símbolos por actividad, con la posición de cada uno (-1 si no está)
+        self.heap = []
+        self.heap_position = [-1] * n
+        for variable in sorted(range(n), key=lambda v: -self.activity[v]):
+            self.heap_insert(variable)
+
+    def heap_insert(self, variable):
+        self.heap_position[variable] = len(self.heap)
+        self.heap.append(variable)
+        self.heap_up(len(self.heap) - 1)
+
+    def heap_up(self, position):
+        heap, where, activity = self.heap, self.heap_position, self.activity
+        variable = heap[position]
+        while position:
+            parent = (position - 1) >> 1
+            if activity[heap[parent]] >= activity[variable]:
+                break
+            heap[position] = heap[parent]
+            where[heap[position]] = position
+            position = parent
+        heap[position] = variable
+        where[variable] = position
+
+    def heap_pop(self):
+        heap, where, activity = self.heap, self.heap_position, self.activity
+        top = heap[0]
+        where[top] = -1
+        last = heap.pop()
+        if heap:
+            position, size = 0, len(heap)
+            while True:
+                child = 2 * position + 1
+                if child >= size:
+                    break
+                if child + 1 < size and activity[heap[child + 1]] > activity[heap[child]]:
+                    child += 1
+                if activity[last] >= activity[heap[child]]:
+                    break
+                heap[position] = heap[child]
+                where[heap[position]] = position
+                position = child
+            heap[position] = last
+            where[last] = position
+        return top
+
+    def bump_variable(self, variable):
+        self.activity[variable] += self.variable_increment
+        if self.activity[variable] > RESCALE_LIMIT:
+            self.activity = [value / RESCALE_LIMIT for value in self.activity]
+            self.variable_increment /= RESCALE_LIMIT
+        if self.heap_position[variable] >= 0:
+            self.heap_up(self.heap_position[variable])
+
+    def bump_clause(self, index):
+        self.clause_activity[index] += self.clause_increment
+        if self.clause_activity[index] > RESCALE_LIMIT:
+            for learned in self.clause_activity:
+                self.clause_activity[learned] /= RESCALE_LIMIT
+            self.clause_increment /= RESCALE_LIMIT
+
+    # Al deshacer asignaciones se guarda su polaridad y los símbolos vuelven al heap
+    def backtrack(self, level):
+        if len(self.trail_lim) <= level:
+            return
+        for literal in self.trail[self.trail_lim[level]:]:
+            variable = literal >> 1
+            self.polarity[variable] = FALSE if literal & 1 else TRUE
+            if self.heap_position[variable] < 0:
+                self.heap_insert(variable)
+        super().backtrack(level)
+
+    # Análisis del conflicto hasta el primer UIP: se resuelve la cláusula en conflicto con las razones de
+    # los literales del nivel actual, del último asignado hacia atrás, hasta que solo queda uno de ese
+    # nivel. Regresa la cláusula aprendida (con el UIP negado primero) y el nivel al que se regresa.
+    def analyze(self, conflict):
+        seen, level, reason, trail = self.seen, self.level, self.reason, self.trail
+        current = len(self.trail_lim)
+        learned = [None]
+        pending = 0
+        literal = None
+        position = len(trail) - 1
+        index = conflict
+        while True:
+            if index in self.learned:
+                self.bump_clause(index)
+            clause = self.clauses[index]
+            for other in (clause if literal is None else clause[1:]):
+                variable = other >> 1
+                if not seen[variable] and level[variable] > 0:
+                    seen[variable] = True
+                    self.bump_variable(variable)
+                    if level[variable] >= current:
+                        pending += 1
+                    else:
+                        learned.append(other)
+            while not seen[trail[position] >> 1]:
+                position -= 1
+            literal = trail[position]
+            position -= 1
+            seen[literal >> 1] = False
+            pending -= 1
+            if pending == 0:
+                break
+            index = reason[literal >> 1]
+        learned[0] = literal ^ 1
+
+        # Minimización: un literal sobra si su razón solo tiene literales que ya están en la cláusula (o
+        # del nivel 0)
+        kept = [learned[0]]
+        for other in learned[1:]:
+            index = reason[other >> 1]
+            if index is None or any(not seen[item >> 1] and level[item >> 1] > 0
+                                    for item in self.clauses[index][1:]):
+                kept.append(other)
+        for other in learned[1:]:
+            seen[other >> 1] = False
+
+        if len(kept) == 1:
+            return kept, 0
+        # El literal del nivel más alto (después del UIP) va en la posición 1 para que lo vigile
+        deepest = max(range(1, len(kept)), key=lambda k: level[kept[k] >> 1])
+        kept[1], kept[deepest] = kept[deepest], kept[1]
+        return kept, level[kept[1] >> 1]
+
+    def learn(self, literals):
+        index = len(self.clauses)
+        self.clauses.append(literals)
+        self.watch(index)
+        self.learned.add(index)
+        self.clause_activity[index] = 0.0
+        self.bump_clause(index)
+        self.lbd[index] = len({self.level[literal >> 1] for literal in literals})
+        self.enqueue(literals[0], index)
+
+    # Borrar la mitad de las cláusulas aprendidas menos útiles (mayor LBD y luego menor actividad), salvo
+    # las glue y las que son razón de una asignación actual; luego se rehacen las listas de watches
+    def reduce(self):
+        locked = {self.reason[literal >> 1] for literal in self.trail}
+        candidates = sorted((index for index in self.learned if self.lbd[index] > GLUE_LBD and index not in locked),
+                            key=lambda index: (-self.lbd[index], self.clause_activity[index]))
+        for index in candidates[:len(candidates) // 2]:
+            self.clauses[index] = None
+            self.learned.discard(index)
+            del self.clause_activity[index]
+            del self.lbd[index]
+        self.watches = [[] for _ in self.watches]
+        for index, clause in enumerate(self.clauses):
+            if clause is not None:
+                self.watch(index)
+
+    # probSAT sobre las cláusulas originales en el nivel 0, desde las polaridades guardadas: en cada paso se
+    # toma una cláusula falsa al azar y se cambia uno de sus símbolos, con más probabilidad el que rompe
+    # menos cláusulas. Las polaridades quedan con la mejor asignación encontrada; si satisface todo es un
+    # modelo y la siguiente bajada lo sigue sin conflictos. Regresa si encontró un modelo.
+    def walk(self, flips, deadline=None):
+        self.walks += 1
+        values, polarity, rand = self.values, self.polarity, self.walk_rng.random
+        learned = self.learned
+        # Las cláusulas ya satisfechas en el nivel 0 no cuentan y los literales falsos se quitan
+        clauses = []
+        for index, clause in enumerate(self.clauses):
+            if clause is None or index in learned or any(values[literal] == TRUE for literal in clause):
+                continue
+            clauses.append([literal for literal in clause if values[literal] == UNASSIGNED])
+        truth = [False] * len(values)
+        for variable in range(len(polarity)):
+            if values[2 * variable] == UNASSIGNED:
+                truth[2 * variable + (polarity[variable] == FALSE)] = True
+        # Por cláusula, cuántos literales verdaderos tiene y el xor de ellos: si tiene uno solo, el xor es ese
+        # literal. breaks[v] es el número de cláusulas donde el literal verdadero de v es el único.
+        occurs = [[] for _ in values]
+        satisfied = [0] * len(clauses)
+        critical = [0] * len(clauses)
+        for index, clause in enumerate(clauses):
+            for literal in clause:
+                occurs[literal].append(index)
+                if truth[literal]:
+                    satisfied[index] += 1
+                    critical[index] ^= literal
+        breaks = [0] * len(polarity)
+        for index, count in enumerate(satisfied):
+            if count == 1:
+                breaks[critical[index] >> 1] += 1
+        falsified = [index for index, count in enumerate(satisfied) if count == 0]
+        position = [-1] * len(clauses)
+        for place, index in enumerate(falsified):
+            position[index] = place
+        weight = [(WALK_EPS + count) ** -WALK_CB for count in range(max(map(len, occurs), default=0) + 1)]
+
+        best = len(falsified)
+        since_best = []
+        for flip in range(flips):
+            if not falsified:
+                break
+            if not flip & 4095 and deadline is not None and time.perf_counter() > deadline:
+                break
+            # Los literales de la cláusula son falsos; cambiar uno rompe las cláusulas donde su contrario es el
+            # único verdadero
+            clause = clauses[falsified[int(rand() * len(falsified))]]
+            scores = [weight[breaks[literal >> 1]] for literal in clause]
+            target = rand() * sum(scores)
+            for literal, score in zip(clause, scores):
+                target -= score
+                if target <= 0:
+                    break
+            truth[literal] = True
+            truth[literal ^ 1] = False
+            for index in occurs[literal]:
+                count = satisfied[index]
+                satisfied[index] = count + 1
+                if count == 0:
+                    last = falsified.pop()
+                    if last != index:
+                        falsified[position[index]] = last
+                        position[last] = position[index]
+                    breaks[literal >> 1] += 1
+                elif count == 1:
+                    breaks[critical[index] >> 1] -= 1
+                critical[index] ^= literal
+            lost = literal ^ 1
+            for index in occurs[lost]:
+                count = satisfied[index] - 1
+                satisfied[index] = count
+                other = critical[index] ^ lost
+                critical[index] = other
+                if count == 0:
+                    breaks[lost >> 1] -= 1
+                    position[index] = len(falsified)
+                    falsified.append(index)
+                elif count == 1:
+                    breaks[other >> 1] += 1
+            since_best.append(literal)
+            if len(falsified) < best:
+                best = len(falsified)
+                since_best.clear()
+        # Regresar a la mejor asignación; solo se usa truth, así que no hace falta actualizar el resto
+        for literal in reversed(since_best):
+            truth[literal] = False
+            truth[literal ^ 1] = True
+        for variable in range(len(polarity)):
+            if values[2 * variable] == UNASSIGNED:
+                polarity[variable] = TRUE if truth[2 * variable] else FALSE
+        return best == 0
+
+    def pick_branch(self):
+        while self.heap:
+            variable = self.heap_pop()
+            if self.values[2 * variable] == UNASSIGNED:
+                return 2 * variable + (self.polarity[variable] == FALSE)
+        return None
+
+    # True si es satisfacible, False si no, y None si se acaba time_limit (en segundos) antes de saberlo
+    def solve(self, time_limit=None):
+        if self.inconsistent:
+            return False
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        restart_number = 0
+        restart_limit = RESTART_BASE * luby(restart_number)
+        conflicts_since_restart = 0
+        next_reduce = REDUCE_FIRST
+        reduce_interval = REDUCE_FIRST
+        next_walk = RESTART_BASE
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts_since_restart += 1
+                if not self.trail_lim:
+                    return False
+                if deadline is not None and self.conflicts % CHECK_EVERY == 0 and time.perf_counter() > deadline:
+                    self.backtrack(0)
+                    return None
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.enqueue(learned[0], None)
+                else:
+                    self.learn(learned)
+                self.variable_increment /= VARIABLE_DECAY
+                self.clause_increment /= CLAUSE_DECAY
+                continue
+
+            if conflicts_since_restart >= restart_limit:
+                self.restarts += 1
+                restart_number += 1
+                restart_limit = RESTART_BASE * luby(restart_number)
+                conflicts_since_restart = 0
+                self.backtrack(0)
+                continue
+            if self.conflicts >= next_reduce:
+                reduce_interval += REDUCE_INCREMENT
+                next_reduce = self.conflicts + reduce_interval
+                self.reduce()
+            if not self.trail_lim and self.conflicts >= next_walk:
+                self.walk(max(WALK_MIN_FLIPS, WALK_RATIO * self.conflicts), deadline)
+                next_walk = 2 * self.conflicts
+
+            literal = self.pick_branch()
+            if literal is None:
+                return True
+            self.decisions += 1
+            self.new_level(literal)
@@ -0,0 +1,233 @@
+import bz2
+import gzip
+import hashlib
+import lzma
+import os
+import tarfile
+from array import array
+
+try:
+    import requests
+except ImportError:
+    # Solo hace falta para descargar instancias; las que ya están en el caché se leen sin él
+    requests = None
+
+# Extensiones que se abren comprimidas; los .tar (también .tar.gz, .tgz, .tar.xz) se leen miembro por miembro
+COMPRESSED = {'.gz': gzip.open, '.xz': lzma.open, '.bz2': bz2.open}
+DECOMPRESS = {'.gz': gzip.decompress, '.xz': lzma.decompress, '.bz2': bz2.decompress}
+ARCHIVES = ('.tar', '.tar.gz', '.tgz', '.tar.xz', '.txz', '.tar.bz2')
+CNF_EXTENSIONS = ('.cnf', '.cnf.gz', '.cnf.xz', '.cnf.bz2', '.dimacs')
+HASH_CHUNK = 1 << 20
+
+
+# Fórmula en CNF con todos los literales en un solo arreglo int32: la cláusula i son los literales
+# literals[offsets[i]:offsets[i + 1]]. Ocupa 4 bytes por literal en lugar de una lista por cláusula.
+class Formula:
+    def __init__(self, num_variables, literals, offsets, name=None):
+        self.num_variables = num_variables
+        self.literals = literals
+        self.offsets = offsets
+        self.name = name
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def clause(self, index):
+        return self.literals[self.offsets[index]:self.offsets[index + 1]].tolist()
+
+    def clauses(self):
+        literals, offsets = self.literals, self.offsets
+        return [literals[offsets[index]:offsets[index + 1]].tolist() for index in range(len(self))]
+
+    def symbols(self):
+        return sorted(set(map(abs, self.literals)))
+
+
+def is_archive(path):
+    return path.endswith(ARCHIVES)
+
+
+def is_cnf(path):
+    return path.endswith(CNF_EXTENSIONS)
+
+
+def open_text(path):
+    for extension, opener in COMPRESSED.items():
+        if path.endswith(extension):
+            return opener(path, 'rt')
+    return open(path, 'r')
+
+
+# Leer DIMACS de un iterable de líneas sin suponer una cláusula por línea: los números se leen de corrido y
+# cada 0 cierra una cláusula. Se ignoran los comentarios (c), el encabezado (p cnf) solo da el mínimo de
+# símbolos, y una línea que empieza con % termina la fórmula (así acaban los archivos de SATLIB).
+def parse_dimacs(lines, name=None):
+    tokens = array('i')
+    num_variables = 0
+    for line in lines:
+        line = line.strip()
+        if not line or line[0] == 'c':
+            continue
+        if line[0] == 'p':
+            header = line.split()
+            if len(header) != 4 or header[1] != 'cnf':
+                raise ValueError(f"{name or 'DIMACS'}: encabezado inválido {line!r}")
+            num_variables = int(header[2])
+            continue
+        if line[0] == '%':
+            break
+        tokens.extend(map(int, line.split()))
+    if tokens and tokens[-1] != 0:
+        # La última cláusula sin 0 al final
+        tokens.append(0)
+
+    offsets = array('q', [0])
+    literals = array('i')
+    start = 0
+    for position, token in enumerate(tokens):
+        if token == 0:
+            literals.extend(tokens[start:position])
+            offsets.append(len(literals))
+            start = position + 1
+    if literals:
+        num_variables = max(num_variables, max(literals), -min(literals))
+    return Formula(num_variables, literals, offsets, name)
+
+
+def read_formula(path):
+    with open_text(path) as file:
+        return parse_dimacs(file, os.path.basename(path))
+
+
+# Las fórmulas de un archivo tar como (nombre del miembro, Formula), leyéndolo como flujo sin extraer nada
+def iter_archive(path, members=None):
+    with tarfile.open(path, 'r|*') as archive:
+        for member in archive:
+            if not member.isfile() or not is_cnf(member.name):
+                continue
+            # El miembro se puede pedir por su ruta dentro del tar o solo por el nombre del archivo
+            if members is not None and member.name not in members and os.path.basename(member.name) not in members:
+                continue
+            # En modo flujo los miembros no se pueden envolver en un archivo de texto; se lee uno a la vez
+            data = archive.extractfile(member).read()
+            for extension, decompress in DECOMPRESS.items():
+                if member.name.endswith(extension):
+                    data = decompress(data)
+            yield member.name, parse_dimacs(data.decode('ascii', errors='replace').splitlines(), member.name)
+
+
+def archive_members(path):
+    with tarfile.open(path, 'r:*') as archive:
+        return [member.name for member in archive.getmembers() if member.isfile() and is_cnf(member.name)]
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Copia binaria de una fórmula ya leída: tres enteros (símbolos, cláusulas, literales), los offsets int64 y
+# los literales int32. El nombre lleva el hash del archivo original, así que si cambia se vuelve a leer. Para
+# un miembro de un tar se agrega el hash de su ruta completa: d1/x.cnf y d2/x.cnf no comparten copia.
+def cache_path(cache_dir, path, member=None, digest=None):
+    digest = digest or file_digest(path)
+    name = os.path.basename(path)
+    if member:
+        name += f".{os.path.basename(member)}.{hashlib.sha256(member.encode()).hexdigest()[:8]}"
+    return os.path.join(cache_dir, f"{name}.{digest[:16]}.cnfbin")
+
+
+def save_formula(formula, path):
+    with open(path, 'wb') as file:
+        array('q', [formula.num_variables, len(formula), len(formula.literals)]).tofile(file)
+        formula.offsets.tofile(file)
+        formula.literals.tofile(file)
+
+
+def read_cached(path, name=None):
+    with open(path, 'rb') as file:
+        header = array('q')
+        header.fromfile(file, 3)
+        offsets, literals = array('q'), array('i')
+        offsets.fromfile(file, header[1] + 1)
+        literals.fromfile(file, header[2])
+    return Formula(header[0], literals, offsets, name)
+
+
+# Leer una fórmula de un archivo (plano o comprimido) o de un miembro de un tar. Con cache_dir, la primera
+# vez se guarda la copia binaria y las siguientes se lee esa copia sin volver a interpretar el texto.
+def load_formula(path, member=None, cache_dir=None):
+    if is_archive(path) and member is None:
+        raise ValueError(f"{path} es un archivo tar: hay que indicar el miembro")
+    name = member or os.path.basename(path)
+    cached = None
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        cached = cache_path(cache_dir, path, member)
+        if os.path.exists(cached):
+            return read_cached(cached, name)
+    if member is None:
+        formula = read_formula(path)
+    else:
+        formula = next((formula for _, formula in iter_archive(path, {member})), None)
+        if formula is None:
+            raise ValueError(f"{path} no tiene el miembro {member!r}")
+    if cached:
+        save_formula(formula, cached)
+    return formula
+
+
+# Todas las fórmulas de un archivo tar, cada una guardada en cache_dir si se da; el archivo se lee una sola
+# vez para las que no están en el caché
+def load_archive(path, cache_dir=None):
+    if cache_dir is None:
+        return [formula for _, formula in iter_archive(path)]
+    os.makedirs(cache_dir, exist_ok=True)
+    digest = file_digest(path)
+    members = archive_members(path)
+    formulas = {}
+    missing = set()
+    for member in members:
+        cached = cache_path(cache_dir, path, member, digest)
+        if os.path.exists(cached):
+            formulas[member] = read_cached(cached, member)
+        else:
+            missing.add(member)
+    if missing:
+        for member, formula in iter_archive(path, missing):
+            save_formula(formula, cache_path(cache_dir, path, member, digest))
+            formulas[member] = formula
+    return [formulas[member] for member in members]
+
+
+# Instancias de un directorio (corpus) como (archivo, miembro): los archivos CNF tienen miembro None y los
+# tar una entrada por cada CNF que contienen
+def list_instances(directory):
+    instances = []
+    for file_name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, file_name)
+        if not os.path.isfile(path):
+            continue
+        if is_archive(path):
+            instances.extend((path, member) for member in archive_members(path))
+        elif is_cnf(path):
+            instances.append((path, None))
+    return instances
+
+
+# Descargar url a cache_dir solo si no se ha descargado antes
+def fetch(url, cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, url.rstrip('/').rsplit('/', 1)[-1])
+    if not os.path.exists(path):
+        if requests is None:
+            raise ImportError(f"Para descargar {url} hace falta requests (pip install -r requirements.txt)")
+        response = requests.get(url)
+        response.raise_for_status()
+        with open(path + '.part', 'wb') as file:
+            file.write(response.content)
+        os.replace(path + '.part', path)
+    return path
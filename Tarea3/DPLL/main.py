@@ -1,17 +1,17 @@
-import requests
-import tarfile
-import os
+import argparse
+import time
 
-def load_dimacs(filename):
-    clauses = []
-    print(f"Filename received: {filename}")
-    with open(filename, 'r') as f:
-        for line in f:
-            if line.startswith('c') or line.startswith('p'):
-                continue
-            clause = list(map(int, line.strip().split()))[:-1]  # Ignorar el 0 al final de cada línea porque es el delimitador
-            clauses.append(clause)
+from cdcl import CDCL
+from dimacs import fetch, is_archive, load_formula, read_formula
+from preprocess import Preprocessor
+from solver import Solver
+
+DPLL = 'dpll'
+CDCL_METHOD = 'cdcl'
 
+# Las cláusulas pueden ocupar varias líneas y el archivo puede estar comprimido (ver dimacs.py)
+def load_dimacs(filename):
+    clauses = read_formula(filename).clauses()
     symbols = get_symbols_from_clauses(clauses)
     return clauses, symbols
 
@@ -24,91 +24,69 @@ def get_symbols_from_clauses(clauses):
     return list(symbols)
 
 
-def dpll(clauses, symbols, model):
-    if all_clause_true(clauses, model):
-        return True
+def make_solver(clauses, symbols, method=DPLL, seed=None):
+    if method == DPLL:
+        return Solver(clauses, symbols)
+    if method == CDCL_METHOD:
+        return CDCL(clauses, symbols, seed)
+    raise ValueError(f"Método desconocido {method!r}")
 
-    if any_clause_false(clauses, model):
-        return False
 
-    P, value = find_unit_clause(clauses, model)
-    if P is not None:
-        symbols.remove(P)
-        model[P] = value
-        return dpll(clauses, symbols[:], model)
+# Resolver con el DPLL iterativo de solver.py (method='dpll') o con CDCL (method='cdcl'); si la fórmula es
+# satisfacible, model queda con el valor de cada símbolo. seed solo cambia el orden inicial de CDCL. Con
+# time_limit (segundos) regresa None si no se decidió a tiempo. Con preprocess la fórmula se simplifica
+# antes (ver preprocess.py) y el modelo se extiende a los símbolos eliminados.
+def dpll(clauses, symbols, model, method=DPLL, seed=None, time_limit=None, preprocess=False):
+    preprocessor = None
+    if preprocess:
+        preprocessor = Preprocessor(clauses, symbols)
+        clauses = preprocessor.run()
+        symbols = get_symbols_from_clauses(clauses)
+    solver = make_solver(clauses, symbols, method, seed)
+    satisfiable = solver.solve(time_limit)
+    if satisfiable:
+        model.update(preprocessor.extend(solver.model()) if preprocessor else solver.model())
+    return satisfiable
 
-    P = symbols.pop(0)
 
-    model[P] = True
-    if dpll(clauses, symbols[:], model):
-        return True
+def dpll_satisfiable(clauses, symbols, method=DPLL, model=None, preprocess=False):
+    return dpll(clauses, symbols, {} if model is None else model, method, preprocess=preprocess)
 
-    model[P] = False
-    return dpll(clauses, symbols[:], model)
-
-
-def all_clause_true(clauses, model):
-    for clause in clauses:
-        if not any(literal in model and model[literal] == True for literal in clause):
-            return False
-    return True
 
-
-def any_clause_false(clauses, model):
-    for clause in clauses:
-        if all((literal in model and model[literal] == False) or (-literal in model and model[-literal] == False) for
-               literal in clause):
-            return True
-    return False
-
-
-def find_unit_clause(clauses, model):
-    for clause in clauses:
-        unassigned = [literal for literal in clause if literal not in model and -literal not in model]
-        if len(unassigned) == 1:
-            P = unassigned[0]
-            value = True if P > 0 else False
-            return abs(P), value
-    return None, None
+# Instancia por defecto: la 37 de CBS_k3_n100_m403_b10 de SATLIB. El tar se descarga una sola vez a
+# CACHE_DIR y después todo se lee de ahí, sin conexión.
+DEFAULT_URL = "https://www.cs.ubc.ca/~hoos/SATLIB/Benchmarks/SAT/CBS/CBS_k3_n100_m403_b10.tar.gz"
+DEFAULT_MEMBER = "CBS_k3_n100_m403_b10_37.cnf"
+CACHE_DIR = 'instancias'
 
 
-def dpll_satisfiable(clauses, symbols):
-    model = {}
-    return dpll(clauses, symbols, model)
-
-def download_and_extract_tar(url, dest_dir):
-    response = requests.get(url)
-    tar_path = os.path.join(dest_dir, "CBS_k3_n100_m403_b10.tar.gz")
-
-    with open(tar_path, 'wb') as f:
-        f.write(response.content)
-
-    with tarfile.open(tar_path, 'r:gz') as tar:
-        tar.extractall(path=dest_dir)
-
-    os.remove(tar_path)
-
-    # Instancia 37
-    target_file = "CBS_k3_n100_m403_b10_37.cnf"
-    extracted_file_path = os.path.join(dest_dir, target_file)
-
-    # Lógica para eliminar todos los archivos excepto CBS_k3_n100_m403_b10_37.cnf
-    for file_name in os.listdir(dest_dir):
-        file_path = os.path.join(dest_dir, file_name)
-        if file_name != target_file and os.path.isfile(file_path) and file_name != "main.py":
-            os.remove(file_path)
-
-    return extracted_file_path
-
-def load_dimacs_from_url(url, dest_dir):
-    cnf_file = download_and_extract_tar(url, dest_dir)
-    return load_dimacs(cnf_file)
-
 if __name__ == '__main__':
-    url = "https://www.cs.ubc.ca/~hoos/SATLIB/Benchmarks/SAT/CBS/CBS_k3_n100_m403_b10.tar.gz"
-
-    clauses, symbols = load_dimacs_from_url(url, ".")
-    if dpll_satisfiable(clauses, symbols):
+    parser = argparse.ArgumentParser(description="Decidir si una fórmula en CNF es satisfacible")
+    parser.add_argument('instancia', nargs='?', help="archivo .cnf (puede ser .gz o .xz) o tar con instancias")
+    parser.add_argument('-m', '--miembro', help="instancia dentro del tar")
+    parser.add_argument('--metodo', choices=[DPLL, CDCL_METHOD], default=CDCL_METHOD)
+    parser.add_argument('--cache', default=CACHE_DIR, help="directorio de descargas y fórmulas ya leídas")
+    parser.add_argument('--preprocesar', action='store_true', help="simplificar la fórmula antes de resolverla")
+    args = parser.parse_args()
+
+    path, member = args.instancia, args.miembro
+    if path is None:
+        path, member = fetch(DEFAULT_URL, args.cache), DEFAULT_MEMBER
+    elif is_archive(path) and member is None:
+        parser.error("para un tar hay que indicar la instancia con --miembro")
+
+    formula = load_formula(path, member, args.cache)
+    start = time.perf_counter()
+    clauses, symbols = formula.clauses(), formula.symbols()
+    if args.preprocesar:
+        preprocessor = Preprocessor(clauses, symbols)
+        clauses = preprocessor.run()
+        symbols = get_symbols_from_clauses(clauses)
+        print(preprocessor.summary())
+    satisfiable = dpll_satisfiable(clauses, symbols, args.metodo)
+    print(f"{formula.name}: {len(formula)} cláusulas, {formula.num_variables} símbolos, "
+          f"{time.perf_counter() - start:.2f}s")
+    if satisfiable:
         print("La fórmula es satisfiable.")
     else:
         print("La fórmula no es satisfiable.")
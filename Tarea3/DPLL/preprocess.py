@@ -0,0 +1,253 @@
+import time
+from collections import defaultdict
+
+# Límites de la eliminación de variables: solo se intenta con símbolos que aparecen a lo más
+# OCCURRENCE_LIMIT veces con cada signo y se descarta si algún resolvente tiene más de RESOLVENT_LIMIT
+# literales; sin ellos el número de resolventes a revisar crece como el producto de las apariciones.
+OCCURRENCE_LIMIT = 16
+RESOLVENT_LIMIT = 20
+
+
+# Máscara de 64 bits con los símbolos de la cláusula: si la de C tiene un bit que no está en la de D, C no
+# puede estar contenida en D y no hace falta comparar las cláusulas
+def signature(clause):
+    mask = 0
+    for literal in clause:
+        mask |= 1 << (abs(literal) & 63)
+    return mask
+
+
+# Simplificación de una fórmula en CNF (con literales como en DIMACS: v o -v) antes de la búsqueda:
+#   - se quitan cláusulas repetidas y tautologías (v y -v en la misma cláusula)
+#   - se propagan las cláusulas unitarias
+#   - subsunción: si C está contenida en D, D sobra. Hacia atrás, cada cláusula nueva o modificada busca
+#     las que subsume; hacia adelante, un resolvente que ya está subsumido no se agrega.
+#   - resolución con autosubsunción: si C con un literal l negado está contenida en D, se quita -l de D
+#   - literales puros: si un símbolo aparece con un solo signo, sus cláusulas se quitan
+#   - eliminación de variables acotada: las cláusulas de v se cambian por todos sus resolventes en v
+#     cuando no son más que las originales
+# Las cláusulas que se quitan con un símbolo (puros y eliminación) se guardan en una pila para extender
+# después el modelo de la fórmula simplificada a un modelo de la original.
+class Preprocessor:
+    def __init__(self, clauses, symbols=()):
+        self.symbols = list(dict.fromkeys(list(symbols) + [abs(literal) for clause in clauses
+                                                          for literal in clause]))
+        self.clauses = []  # frozenset de literales, o None si se quitó
+        self.signatures = []
+        self.occurs = defaultdict(set)
+        self.fixed = {}  # Símbolos asignados por cláusulas unitarias
+        self.eliminated = []  # Pila de (literal, cláusula quitada): el literal se hace verdadero si hace falta
+        self.eliminated_symbols = set()
+        self.units = []
+        self.touched = set()
+        self.unsatisfiable = False
+        self.stats = {'duplicadas': 0, 'tautologias': 0, 'unitarias': 0, 'subsumidas': 0, 'fortalecidas': 0,
+                      'puros': 0, 'eliminados': 0, 'resolventes': 0}
+        self.original_clauses = len(clauses)
+        seen = set()
+        for clause in clauses:
+            clause = frozenset(clause)
+            if any(-literal in clause for literal in clause):
+                self.stats['tautologias'] += 1
+            elif clause in seen:
+                self.stats['duplicadas'] += 1
+            else:
+                seen.add(clause)
+                self.add(clause)
+
+    def add(self, clause):
+        if not clause:
+            self.unsatisfiable = True
+            return
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.signatures.append(signature(clause))
+        for literal in clause:
+            self.occurs[literal].add(index)
+        if len(clause) == 1:
+            self.units.append(index)
+        self.touched.add(index)
+
+    def remove(self, index):
+        for literal in self.clauses[index]:
+            self.occurs[literal].discard(index)
+        self.clauses[index] = None
+
+    # Quitar literal de la cláusula index
+    def strengthen(self, index, literal):
+        clause = self.clauses[index] - {literal}
+        self.occurs[literal].discard(index)
+        self.clauses[index] = clause
+        self.signatures[index] = signature(clause)
+        if not clause:
+            self.unsatisfiable = True
+        elif len(clause) == 1:
+            self.units.append(index)
+        self.touched.add(index)
+
+    # Asignar los literales de las cláusulas unitarias: se quitan las cláusulas que satisfacen y su
+    # contrario de las demás (que pueden volverse unitarias)
+    def propagate(self):
+        while self.units and not self.unsatisfiable:
+            clause = self.clauses[self.units.pop()]
+            if clause is None or len(clause) != 1:
+                continue
+            (literal,) = clause
+            self.fixed[abs(literal)] = literal > 0
+            self.stats['unitarias'] += 1
+            for index in list(self.occurs[literal]):
+                self.remove(index)
+            for index in list(self.occurs[-literal]):
+                self.strengthen(index, -literal)
+
+    # Subsunción hacia atrás y autosubsunción desde las cláusulas nuevas o modificadas. Basta con revisar
+    # las apariciones (con los dos signos) del literal de C que menos aparece: cualquier D que C subsuma o
+    # fortalezca contiene ese literal o su contrario.
+    def subsume(self):
+        clauses, signatures, occurs = self.clauses, self.signatures, self.occurs
+        while self.touched and not self.unsatisfiable:
+            index = self.touched.pop()
+            clause = clauses[index]
+            if clause is None:
+                continue
+            mask = signatures[index]
+            literal = min(clause, key=lambda item: len(occurs[item]) + len(occurs[-item]))
+            for other in list(occurs[literal] | occurs[-literal]):
+                target = clauses[other]
+                if other == index or target is None or len(target) < len(clause) or mask & ~signatures[other]:
+                    continue
+                missing = clause - target
+                if not missing:
+                    self.remove(other)
+                    self.stats['subsumidas'] += 1
+                elif len(missing) == 1:
+                    (flipped,) = missing
+                    if -flipped in target:
+                        self.strengthen(other, -flipped)
+                        self.stats['fortalecidas'] += 1
+            self.propagate()
+
+    # Subsunción hacia adelante: si alguna cláusula está contenida en clause
+    def subsumed(self, clause):
+        mask = signature(clause)
+        for literal in clause:
+            for index in self.occurs[literal]:
+                other = self.clauses[index]
+                if len(other) <= len(clause) and not self.signatures[index] & ~mask and other <= clause:
+                    return True
+        return False
+
+    # Quitar todas las cláusulas de symbol guardándolas en la pila
+    def eliminate(self, symbol):
+        for literal in (symbol, -symbol):
+            for index in list(self.occurs[literal]):
+                self.eliminated.append((literal, self.clauses[index]))
+                self.remove(index)
+        self.eliminated_symbols.add(symbol)
+
+    def pure_literals(self):
+        changed = True
+        while changed:
+            changed = False
+            for symbol in self.symbols:
+                if symbol in self.fixed or symbol in self.eliminated_symbols:
+                    continue
+                positive, negative = self.occurs[symbol], self.occurs[-symbol]
+                if bool(positive) != bool(negative):
+                    self.eliminate(symbol)
+                    self.stats['puros'] += 1
+                    changed = True
+
+    # Resolventes no tautológicos de symbol, o None si son más que las cláusulas que reemplazan o alguno es
+    # demasiado largo
+    def resolvents(self, symbol):
+        positive = [self.clauses[index] for index in self.occurs[symbol]]
+        negative = [self.clauses[index] for index in self.occurs[-symbol]]
+        if len(positive) > OCCURRENCE_LIMIT or len(negative) > OCCURRENCE_LIMIT:
+            return None
+        limit = len(positive) + len(negative)
+        resolvents = []
+        for first in positive:
+            first = first - {symbol}
+            for second in negative:
+                resolvent = first | (second - {-symbol})
+                if any(-literal in resolvent for literal in first):
+                    continue
+                if len(resolvent) > RESOLVENT_LIMIT or len(resolvents) == limit:
+                    return None
+                resolvents.append(resolvent)
+        return resolvents
+
+    def eliminate_variables(self):
+        changed = True
+        while changed and not self.unsatisfiable:
+            changed = False
+            # Primero los símbolos con menos resolventes posibles
+            candidates = sorted((symbol for symbol in self.symbols
+                                 if symbol not in self.fixed and symbol not in self.eliminated_symbols),
+                                key=lambda symbol: len(self.occurs[symbol]) * len(self.occurs[-symbol]))
+            for symbol in candidates:
+                if symbol in self.fixed or symbol in self.eliminated_symbols:
+                    continue
+                if not self.occurs[symbol] and not self.occurs[-symbol]:
+                    continue
+                resolvents = self.resolvents(symbol)
+                if resolvents is None:
+                    continue
+                self.eliminate(symbol)
+                self.stats['eliminados'] += 1
+                for resolvent in resolvents:
+                    if not self.subsumed(resolvent):
+                        self.add(resolvent)
+                        self.stats['resolventes'] += 1
+                self.propagate()
+                self.subsume()
+                if self.unsatisfiable:
+                    return
+                changed = True
+
+    # Aplicar todas las técnicas; regresa las cláusulas simplificadas (una lista vacía si la fórmula se
+    # satisface con los símbolos asignados y eliminados, [[]] si es insatisfacible) y deja las
+    # estadísticas en stats
+    def run(self):
+        start = time.perf_counter()
+        self.propagate()
+        self.subsume()
+        if not self.unsatisfiable:
+            self.pure_literals()
+            self.eliminate_variables()
+        clauses = [[]] if self.unsatisfiable else self.remaining()
+        symbols = {abs(literal) for clause in clauses for literal in clause}
+        self.stats.update({
+            'clausulas_originales': self.original_clauses,
+            'clausulas': len(clauses),
+            'clausulas_eliminadas': self.original_clauses - len(clauses),
+            'simbolos_originales': len(self.symbols),
+            'simbolos': len(symbols),
+            'simbolos_eliminados': len(self.symbols) - len(symbols),
+            'insatisfacible': self.unsatisfiable,
+            'tiempo': time.perf_counter() - start,
+        })
+        return clauses
+
+    def remaining(self):
+        return [sorted(clause, key=abs) for clause in self.clauses if clause is not None]
+
+    # Extender un modelo de la fórmula simplificada (dict de símbolo a valor) a uno de la original: los
+    # símbolos de las unitarias toman su valor, los libres falso, y se recorre la pila de la última cláusula
+    # quitada a la primera haciendo verdadero el literal guardado de cada cláusula que no se cumpla
+    def extend(self, model):
+        full = dict.fromkeys(self.symbols, False)
+        full.update(model)
+        full.update(self.fixed)
+        for literal, clause in reversed(self.eliminated):
+            if not any(full[abs(other)] == (other > 0) for other in clause):
+                full[abs(literal)] = literal > 0
+        return full
+
+    def summary(self):
+        stats = self.stats
+        return (f"preproceso: {stats['clausulas_eliminadas']} de {stats['clausulas_originales']} cláusulas y "
+                f"{stats['simbolos_eliminados']} de {stats['simbolos_originales']} símbolos eliminados "
+                f"({stats['unitarias']} unitarias, {stats['puros']} puros, {stats['eliminados']} por resolución, "
+                f"{stats['subsumidas']} subsumidas, {stats['fortalecidas']} fortalecidas) en {stats['tiempo']:.2f}s")
@@ -0,0 +1,198 @@
+import time
+
+# Valores de un literal
+TRUE = 1
+FALSE = -1
+UNASSIGNED = 0
+# Cada cuántos conflictos se revisa el límite de tiempo
+CHECK_EVERY = 256
+
+
+# Estado del solver: los símbolos se numeran 0..n-1 y el literal del símbolo v es 2v (positivo) o 2v + 1
+# (negado), así que el contrario de un literal es lit ^ 1. values tiene el valor de cada literal.
+#
+# Cada cláusula de dos o más literales vigila sus dos primeros (watched literals): solo se revisa cuando
+# uno de los dos se vuelve falso, y entonces se busca otro literal no falso que vigilar; si no hay, la
+# cláusula es unitaria (se asigna el otro vigilado) o es un conflicto. Así la propagación solo toca las
+# cláusulas afectadas por cada asignación y al deshacer asignaciones no hay nada que actualizar.
+# watches[lit] tiene pares (bloqueador, cláusula) de las cláusulas que vigilan lit; el bloqueador es otro
+# literal de la cláusula y, si es verdadero, la cláusula ya se cumple y no hace falta leerla.
+#
+# Las asignaciones se guardan en orden en trail, con el nivel de decisión y la cláusula que las forzó
+# (reason, None para decisiones); trail_lim[d] es dónde empieza el nivel d + 1 en trail. Regresar a un
+# nivel es solo deshacer el final de trail.
+class Solver:
+    def __init__(self, clauses, symbols=()):
+        self.variables = list(dict.fromkeys(list(symbols) + [abs(literal) for clause in clauses
+                                                            for literal in clause]))
+        self.index = {variable: number for number, variable in enumerate(self.variables)}
+        n = len(self.variables)
+        self.values = [UNASSIGNED] * (2 * n)
+        self.level = [0] * n
+        self.reason = [None] * n
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.clauses = []
+        self.watches = [[] for _ in range(2 * n)]
+        # Se encontró una cláusula vacía (o dos unitarias contrarias): la fórmula no es satisfacible
+        self.inconsistent = False
+        self.conflicts = 0
+        self.decisions = 0
+        for clause in clauses:
+            self.add_clause([self.literal(literal) for literal in clause])
+
+    def literal(self, literal):
+        return 2 * self.index[abs(literal)] + (literal < 0)
+
+    # Agregar una cláusula en el nivel 0; las unitarias se asignan de una vez y las tautologías se ignoran
+    def add_clause(self, literals):
+        literals = list(dict.fromkeys(literals))
+        if any(literal ^ 1 in literals for literal in literals):
+            return None
+        if not literals:
+            self.inconsistent = True
+            return None
+        if len(literals) == 1:
+            value = self.values[literals[0]]
+            if value == FALSE:
+                self.inconsistent = True
+            elif value == UNASSIGNED:
+                self.enqueue(literals[0], None)
+            return None
+        index = len(self.clauses)
+        self.clauses.append(literals)
+        self.watch(index)
+        return index
+
+    def watch(self, index):
+        clause = self.clauses[index]
+        self.watches[clause[0]].append((clause[1], index))
+        self.watches[clause[1]].append((clause[0], index))
+
+    def enqueue(self, literal, reason):
+        self.values[literal] = TRUE
+        self.values[literal ^ 1] = FALSE
+        variable = literal >> 1
+        self.level[variable] = len(self.trail_lim)
+        self.reason[variable] = reason
+        self.trail.append(literal)
+
+    def decision_level(self):
+        return len(self.trail_lim)
+
+    def new_level(self, literal):
+        self.trail_lim.append(len(self.trail))
+        self.enqueue(literal, None)
+
+    # Deshacer todas las asignaciones de los niveles mayores que level
+    def backtrack(self, level):
+        if len(self.trail_lim) <= level:
+            return
+        values = self.values
+        start = self.trail_lim[level]
+        for literal in self.trail[start:]:
+            values[literal] = values[literal ^ 1] = UNASSIGNED
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    # Propagar las asignaciones pendientes de trail; regresa el índice de la cláusula en conflicto o None.
+    # Es el ciclo más caliente del solver, por eso las asignaciones se hacen aquí mismo y no con enqueue.
+    # La lista de watches del literal que se volvió falso se recorre con un iterador y se arma una nueva con
+    # las entradas que se quedan; en un conflicto el resto del iterador pasa tal cual.
+    def propagate(self):
+        values, clauses, watches, trail = self.values, self.clauses, self.watches, self.trail
+        level, reason = self.level, self.reason
+        current = len(self.trail_lim)
+        qhead = self.qhead
+        while qhead < len(trail):
+            false_literal = trail[qhead] ^ 1
+            qhead += 1
+            kept = []
+            keep = kept.append
+            entries = iter(watches[false_literal])
+            for entry in entries:
+                blocker = entry[0]
+                if values[blocker] == TRUE:
+                    keep(entry)
+                    continue
+                index = entry[1]
+                clause = clauses[index]
+                # El literal que se volvió falso queda en la posición 1
+                first = clause[0]
+                if first == false_literal:
+                    first = clause[1]
+                    clause[0] = first
+                    clause[1] = false_literal
+                if first != blocker:
+                    entry = (first, index)
+                    if values[first] == TRUE:
+                        keep(entry)
+                        continue
+                for k in range(2, len(clause)):
+                    other = clause[k]
+                    if values[other] != FALSE:
+                        clause[1] = other
+                        clause[k] = false_literal
+                        watches[other].append(entry)
+                        break
+                else:
+                    keep(entry)
+                    if values[first] == FALSE:
+                        # Conflicto: las cláusulas que faltan siguen vigilando este literal
+                        kept.extend(entries)
+                        watches[false_literal] = kept
+                        self.qhead = len(trail)
+                        return index
+                    values[first] = TRUE
+                    values[first ^ 1] = FALSE
+                    level[first >> 1] = current
+                    reason[first >> 1] = index
+                    trail.append(first)
+            watches[false_literal] = kept
+        self.qhead = qhead
+        return None
+
+    # DPLL iterativo: se decide el siguiente símbolo libre en el orden de symbols, primero verdadero y luego
+    # falso. En un conflicto se regresa a la decisión más reciente que no ha probado su segundo valor
+    # (backtracking cronológico) y se prueba ese valor. Regresa None si se acaba time_limit (en segundos).
+    def dpll(self, time_limit=None):
+        if self.inconsistent:
+            return False
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        n = len(self.variables)
+        position = 0
+        decisions = []  # (posición del símbolo decidido, si ya se probó su segundo valor)
+        while True:
+            if self.propagate() is not None:
+                self.conflicts += 1
+                if deadline is not None and self.conflicts % CHECK_EVERY == 0 and time.perf_counter() > deadline:
+                    self.backtrack(0)
+                    return None
+                while decisions and decisions[-1][1]:
+                    decisions.pop()
+                if not decisions:
+                    return False
+                position = decisions[-1][0]
+                decision = self.trail[self.trail_lim[len(decisions) - 1]]
+                self.backtrack(len(decisions) - 1)
+                decisions[-1] = (position, True)
+                self.new_level(decision ^ 1)
+                continue
+            # Los símbolos antes de position se asignaron antes de la última decisión y siguen asignados
+            while position < n and self.values[2 * position] != UNASSIGNED:
+                position += 1
+            if position == n:
+                return True
+            decisions.append((position, False))
+            self.decisions += 1
+            self.new_level(2 * position)
+
+    # Las subclases cambian el método de búsqueda; True, False o None si se acaba el tiempo
+    def solve(self, time_limit=None):
+        return self.dpll(time_limit)
+
+    # Modelo como dict de símbolo a valor
+    def model(self):
+        return {variable: self.values[2 * number] == TRUE for number, variable in enumerate(self.variables)}